@@ -0,0 +1,81 @@
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+from posts import search
+
+
+class PostSearchFilter(BaseFilterBackend):
+    """Полнотекстовый поиск по ?search=: результаты упорядочены
+    по релевантности."""
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search.search(queryset, query)
+
+
+class PostFilter(BaseFilterBackend):
+    """Фильтры ?group=<id>, ?author=<username>, ?since= и ?until=
+    (дата или дата-время ISO 8601; без смещения - в часовом поясе
+    TIME_ZONE, дата - с полуночи). Опираются на индексы
+    (group_id, created) и (author_id, created)."""
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        if 'group' in params:
+            group = params['group']
+            if not group.isdigit():
+                raise ValidationError({'group': 'Ожидается id сообщества.'})
+            queryset = queryset.filter(group_id=int(group))
+        if 'author' in params:
+            queryset = queryset.filter(author__username=params['author'])
+        if 'since' in params:
+            queryset = queryset.filter(
+                created__gte=self.parse_moment(params, 'since')
+            )
+        if 'until' in params:
+            queryset = queryset.filter(
+                created__lt=self.parse_moment(params, 'until')
+            )
+        return queryset
+
+    @staticmethod
+    def parse_moment(params, name):
+        value = params[name]
+        try:
+            moment = parse_datetime(value) or parse_date(value)
+        except ValueError:
+            moment = None
+        if moment is None:
+            raise ValidationError(
+                {name: 'Ожидается дата или дата-время в формате ISO 8601.'}
+            )
+        if not isinstance(moment, datetime):
+            moment = datetime.combine(moment, time.min)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
+
+
+class PostOrderingFilter(OrderingFilter):
+    """?ordering=created или ?ordering=-created. Дополняет порядок
+    полем id, чтобы курсор был однозначным, и не трогает порядок
+    результатов поиска, если параметр не задан."""
+
+    def get_ordering(self, request, queryset, view):
+        ordering = tuple(super().get_ordering(request, queryset, view))
+        if ordering and ordering[-1].lstrip('-') != 'id':
+            ordering += ('-id' if ordering[-1].startswith('-') else 'id',)
+        return ordering
+
+    def filter_queryset(self, request, queryset, view):
+        if self.ordering_param not in request.query_params:
+            return queryset
+        return super().filter_queryset(request, queryset, view)
@@ -0,0 +1,35 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+# Размер страницы по умолчанию и верхняя граница для ?limit=
+PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+
+
+class BoundedCursorPagination(CursorPagination):
+    """Курсорная пагинация без COUNT(*) и OFFSET с ограниченным ?limit=."""
+    page_size = PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+
+
+class PostPagination(BoundedCursorPagination):
+    ordering = ('-created', '-id')
+
+
+class CommentPagination(BoundedCursorPagination):
+    ordering = ('created', 'id')
+
+
+class GroupPagination(BoundedCursorPagination):
+    ordering = ('id',)
+
+
+class FollowPagination(BoundedCursorPagination):
+    ordering = ('-id',)
+
+
+class SearchPagination(PageNumberPagination):
+    """Постраничная выдача результатов поиска в порядке релевантности."""
+    page_size = PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
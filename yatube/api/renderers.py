@@ -0,0 +1,53 @@
+"""Потоковая выдача списков: ?format=ndjson или ?format=json-stream.
+
+Рендерер получает итератор объектов и отдаёт закодированные строки по
+одной, поэтому список любой длины не собирается в памяти целиком.
+"""
+import json
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Сколько строк читать из БД за одно обращение курсора
+STREAM_CHUNK_SIZE = 500
+# Сколько последних постов отдаёт поток всем, кроме персонала: таблица
+# постов растёт без границ, в отличие от комментариев поста или подписок
+STREAM_POSTS_LIMIT = 1000
+
+
+class StreamingRenderer(BaseRenderer):
+    charset = 'utf-8'
+    begin, separator, end = b'', b'', b''
+
+    def encode(self, item):
+        return json.dumps(
+            item, cls=JSONEncoder, ensure_ascii=False
+        ).encode(self.charset)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Генератор байтов. Одиночный объект (деталь, ошибка) выдаётся
+        как список из одного элемента."""
+        if isinstance(data, dict):
+            data = [data]
+        yield self.begin
+        for number, item in enumerate(data):
+            if number:
+                yield self.separator
+            yield self.encode(item)
+        yield self.end
+
+
+class NDJSONRenderer(StreamingRenderer):
+    """Объект JSON на строку."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def encode(self, item):
+        return super().encode(item) + b'\n'
+
+
+class StreamingJSONRenderer(StreamingRenderer):
+    """Обычный массив JSON, записываемый по элементу."""
+    media_type = 'application/json'
+    format = 'json-stream'
+    begin, separator, end = b'[', b',', b']'
@@ -1,11 +1,153 @@
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
 
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from rest_framework.validators import UniqueTogetherValidator
 
 from api.validators import vlidate_user_is_not_author
+from posts import bulk
 from posts.models import Comment, Follow, Group, Like, Post, User
 
+BATCH_MAX_SIZE = 100
+
+
+class PrefetchedRelatedMixin:
+    """Связь, объекты которой пакетный сериализатор выбирает для всех
+    элементов одним запросом."""
+    prefetched = None
+
+    def prefetch(self, values):
+        values = {value for value in values if isinstance(value, (int, str))}
+        try:
+            objects = self.get_queryset().filter(
+                **{f'{self.lookup}__in': values}
+            )
+            self.prefetched = {
+                str(getattr(obj, self.lookup)): obj for obj in objects
+            }
+        except (TypeError, ValueError):
+            # некорректные значения отклонит проверка каждого элемента
+            self.prefetched = None
+
+    def to_internal_value(self, data):
+        if self.prefetched is not None and str(data) in self.prefetched:
+            return self.prefetched[str(data)]
+        return super().to_internal_value(data)
+
+
+class PrefetchedPrimaryKeyRelatedField(PrefetchedRelatedMixin,
+                                       serializers.PrimaryKeyRelatedField):
+    lookup = 'pk'
+
+
+class PrefetchedSlugRelatedField(PrefetchedRelatedMixin,
+                                 serializers.SlugRelatedField):
+    @property
+    def lookup(self):
+        return self.slug_field
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """Пакетное создание объектов.
+
+    Связи всех элементов выбираются общим запросом, уникальность
+    проверяется одним запросом на пакет, а строки вставляются одним
+    bulk_create в транзакции. Ошибки возвращаются списком по элементам.
+    """
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list) or not data:
+            return super().to_internal_value(data)
+        if len(data) > BATCH_MAX_SIZE:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    f'В пакете не больше {BATCH_MAX_SIZE} объектов.'
+                ]
+            })
+        unique_validators = self.split_unique_validators()
+        self.prefetch_relations(data)
+        items, errors = [], []
+        for item in data:
+            try:
+                items.append(self.child.run_validation(item))
+                errors.append({})
+            except serializers.ValidationError as exc:
+                items.append(None)
+                errors.append(exc.detail)
+        self.check_unique(items, errors, unique_validators)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
+
+    def split_unique_validators(self):
+        """Убирает у элемента UniqueTogetherValidator: он делал бы запрос
+        на каждый элемент. Возвращает убранные валидаторы."""
+        if not hasattr(self, '_unique_validators'):
+            validators = self.child.validators
+            self._unique_validators = [
+                validator for validator in validators
+                if isinstance(validator, UniqueTogetherValidator)
+            ]
+            self.child.validators = [
+                validator for validator in validators
+                if validator not in self._unique_validators
+            ]
+        return self._unique_validators
+
+    def prefetch_relations(self, data):
+        for field in self.child.fields.values():
+            if isinstance(field, PrefetchedRelatedMixin) and not (
+                field.read_only
+            ):
+                field.prefetch(
+                    item.get(field.field_name) for item in data
+                    if isinstance(item, dict)
+                )
+
+    def check_unique(self, items, errors, validators):
+        """Проверяет UniqueTogetherValidator одним запросом на пакет и
+        дописывает ошибки к элементам, включая повторы внутри пакета."""
+        defaults = self.child._read_only_defaults()
+        valid = [
+            (item, item_errors) for item, item_errors in zip(items, errors)
+            if item is not None
+        ]
+        for validator in validators:
+            keys = [
+                tuple(
+                    getattr(value, 'pk', value) for value in (
+                        {**defaults, **item}[field]
+                        for field in validator.fields
+                    )
+                )
+                for item, _ in valid
+            ]
+            if not keys:
+                continue
+            existing = set(validator.queryset.filter(reduce(or_, (
+                Q(**dict(zip(validator.fields, key))) for key in keys
+            ))).values_list(*validator.fields))
+            message = validator.message.format(
+                field_names=', '.join(validator.fields)
+            )
+            seen = set()
+            for key, (_, item_errors) in zip(keys, valid):
+                if key in existing or key in seen:
+                    item_errors.setdefault(
+                        api_settings.NON_FIELD_ERRORS_KEY, []
+                    ).append(message)
+                seen.add(key)
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        return bulk.bulk_create(model, (
+            model(**attrs) for attrs in validated_data
+        ))
+
 
 class GroupSerializer(serializers.ModelSerializer):
     class Meta:
@@ -14,13 +156,15 @@ class GroupSerializer(serializers.ModelSerializer):
 
 
 class PostSerializer(serializers.ModelSerializer):
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
     author = serializers.SlugRelatedField(
         slug_field='username', read_only=True
     )
 
     class Meta:
         model = Post
-        exclude = ('created',)
+        fields = ('id', 'author', 'text', 'image', 'group')
+        list_serializer_class = BulkListSerializer
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -30,8 +174,9 @@ class CommentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Comment
-        exclude = ('created',)
+        exclude = ('created', 'updated')
         read_only_fields = ('post',)
+        list_serializer_class = BulkListSerializer
 
 
 class FollowSerializer(serializers.ModelSerializer):
@@ -40,7 +185,7 @@ class FollowSerializer(serializers.ModelSerializer):
         read_only=True,
         default=serializers.CurrentUserDefault()
     )
-    author = serializers.SlugRelatedField(
+    author = PrefetchedSlugRelatedField(
         slug_field='username',
         queryset=User.objects.all()
     )
@@ -48,6 +193,7 @@ class FollowSerializer(serializers.ModelSerializer):
     class Meta:
         model = Follow
         exclude = ('id',)
+        list_serializer_class = BulkListSerializer
         validators = [
             vlidate_user_is_not_author,
             UniqueTogetherValidator(
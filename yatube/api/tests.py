@@ -1,11 +1,24 @@
-from django.test import TestCase
+import json
+from datetime import datetime, timezone
+from unittest import mock, skipUnless
+
+from django.db import connection
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APIClient, APITestCase
 
-from api.serializers import PostSerializer
-from posts.models import Group, Post, User
+from api.pagination import MAX_PAGE_SIZE, PAGE_SIZE
+from api.serializers import BATCH_MAX_SIZE, CommentSerializer, PostSerializer
+from api.urls import router_v1
+from api.views import PostViewSet
+from core.explain import query_plan
+from core.testing import Budget, BudgetTestMixin
+from posts import search
+from posts.models import (
+    AuthorStats, Comment, Follow, Group, Like, Post, TimelineEntry, User
+)
 
 AUTHOR = 'Author'
 SLUG = 'test-slug'
@@ -34,10 +47,22 @@ class PostApiTestCase(APITestCase):
     def test_get_list(self):
         response = self.client.get(POST_LIST_URL)
         serializer_data = PostSerializer(
-            [self.post_1, self.post_2], many=True
+            [self.post_2, self.post_1], many=True
         ).data
         self.assertEqual(status.HTTP_200_OK, response.status_code)
-        self.assertEqual(serializer_data, response.data)
+        self.assertEqual(serializer_data, response.data['results'])
+        self.assertNotIn('count', response.data)
+
+    def test_list_page_size_is_bounded(self):
+        Post.objects.bulk_create(
+            Post(author=self.user_author, text=POST_1_TEXT)
+            for _ in range(MAX_PAGE_SIZE)
+        )
+        response = self.client.get(POST_LIST_URL, {'limit': 1000000})
+        self.assertEqual(len(response.data['results']), MAX_PAGE_SIZE)
+        self.assertIsNotNone(response.data['next'])
+        next_page = self.client.get(response.data['next'])
+        self.assertEqual(len(next_page.data['results']), 2)
 
     def test_get_detail(self):
         response = self.client.get(self.POST_DETAIL_URL)
@@ -92,3 +117,488 @@ class PostSerializerTestCase(TestCase):
             'image': None
         }
         self.assertEqual(data, expected_data)
+
+
+class ListQueryCountTestCase(APITestCase):
+    """Число запросов к списку не зависит от размера страницы."""
+    PAGE_SIZES = (1, 5, 20)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        authors = [
+            User.objects.create_user(username=f'{AUTHOR}{i}')
+            for i in range(max(cls.PAGE_SIZES))
+        ]
+        cls.reader = User.objects.create_user(username='Reader')
+        Group.objects.bulk_create(
+            Group(title=f'Группа {i}', slug=f'{SLUG}-{i}')
+            for i in range(max(cls.PAGE_SIZES))
+        )
+        cls.post = Post.objects.create(author=authors[0], text=POST_1_TEXT)
+        Post.objects.bulk_create(
+            Post(author=author, text=POST_2_TEXT) for author in authors
+        )
+        Comment.objects.bulk_create(
+            Comment(author=author, post=cls.post, text=POST_2_TEXT)
+            for author in authors
+        )
+        Follow.objects.bulk_create(
+            Follow(user=cls.reader, author=author) for author in authors
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.reader)
+
+    def test_list_endpoints_query_count(self):
+        cases = [
+            [POST_LIST_URL, 1],
+            [reverse('comment-list', args=[self.post.id]), 2],
+            [reverse('group-list'), 1],
+            [reverse('follow-list'), 1],
+        ]
+        for url, expected in cases:
+            for limit in self.PAGE_SIZES:
+                with self.subTest(url=url, limit=limit):
+                    with self.assertNumQueries(expected):
+                        response = self.client.get(url, {'limit': limit})
+                    self.assertEqual(len(response.data['results']), limit)
+
+
+class PostFilterTestCase(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR)
+        cls.other = User.objects.create_user(username='Other')
+        cls.group = Group.objects.create(slug=SLUG)
+        cls.group_post = Post.objects.create(
+            author=cls.author, text=POST_1_TEXT, group=cls.group
+        )
+        cls.other_post = Post.objects.create(
+            author=cls.other, text=POST_2_TEXT
+        )
+        Post.objects.filter(id=cls.group_post.id).update(
+            created=datetime(2021, 1, 1, tzinfo=timezone.utc)
+        )
+
+    def ids(self, params):
+        response = self.client.get(POST_LIST_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [post['id'] for post in response.data['results']]
+
+    def test_filters(self):
+        old, new = self.group_post.id, self.other_post.id
+        cases = [
+            [{'group': self.group.id}, [old]],
+            [{'author': 'Other'}, [new]],
+            [{'since': '2022-01-01'}, [new]],
+            [{'until': '2022-01-01T00:00:00Z'}, [old]],
+            [{'ordering': 'created'}, [old, new]],
+            [{'ordering': '-created'}, [new, old]],
+        ]
+        for params, expected in cases:
+            with self.subTest(params=params):
+                self.assertEqual(self.ids(params), expected)
+
+    def test_dates_in_configured_time_zone(self):
+        """Дата и дата-время без смещения отсчитываются в TIME_ZONE."""
+        # 2021-01-01 00:00 UTC - это 03:00 по Москве
+        old = self.group_post.id
+        cases = [
+            [{'since': '2021-01-01'}, [old]],
+            [{'since': '2021-01-01T03:00:00'}, [old]],
+            [{'since': '2021-01-01T03:00:01'}, []],
+            [{'until': '2021-01-01T03:00:01'}, [old]],
+            [{'until': '2021-01-01T03:00:00'}, []],
+        ]
+        with override_settings(TIME_ZONE='Europe/Moscow'):
+            for params, expected in cases:
+                with self.subTest(params=params):
+                    self.assertEqual(
+                        self.ids({**params, 'author': AUTHOR}), expected
+                    )
+
+    def test_invalid_filters(self):
+        for params in [{'group': 'abc'}, {'since': 'вчера'}]:
+            with self.subTest(params=params):
+                response = self.client.get(POST_LIST_URL, params)
+                self.assertEqual(
+                    response.status_code, status.HTTP_400_BAD_REQUEST
+                )
+
+
+class PostFilterQueryPlanTestCase(TestCase):
+    """Отфильтрованные выборки идут по составным индексам без полного
+    просмотра таблицы и без сортировки во временном B-дереве,
+    в том числе после роста таблицы."""
+    SIZES = (100, 3000)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.authors = [
+            User.objects.create_user(username=f'{AUTHOR}{i}')
+            for i in range(10)
+        ]
+        cls.groups = [
+            Group.objects.create(title=str(i), slug=f'{SLUG}-{i}')
+            for i in range(10)
+        ]
+
+    def grow_to(self, size):
+        Post.objects.bulk_create(
+            Post(
+                author=self.authors[i % 10],
+                group=self.groups[i % 10] if i % 3 else None,
+                text=POST_1_TEXT
+            )
+            for i in range(size - Post.objects.count())
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    @skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN SQLite')
+    def test_filtered_queries_use_indexes(self):
+        ordered = Post.objects.order_by('-created', '-id')
+        since = datetime(2021, 1, 1, tzinfo=timezone.utc)
+        cases = [
+            ['post_group_created_idx',
+             ordered.filter(group_id=self.groups[0].id)],
+            ['post_author_created_idx',
+             ordered.filter(author_id=self.authors[0].id)],
+            ['post_group_created_idx',
+             ordered.filter(group_id=self.groups[0].id, created__gte=since)],
+        ]
+        for size in self.SIZES:
+            self.grow_to(size)
+            for index, queryset in cases:
+                with self.subTest(size=size, index=index):
+                    plan = query_plan(queryset[:PAGE_SIZE + 1])
+                    self.assertRegex(
+                        plan, f'SEARCH (TABLE )?posts_post USING INDEX {index}'
+                    )
+                    self.assertNotIn('TEMP B-TREE', plan)
+
+
+# Бюджеты эндпоинтов api.urls (кроме выдачи JWT) для авторизованного
+# читателя; одна страница - PAGE_SIZE объектов.
+API_BUDGETS = {
+    'api-root': Budget(queries=0),
+    'post-list': Budget(queries=1),
+    'post-detail': Budget(queries=1),
+    'group-list': Budget(queries=1),
+    'group-detail': Budget(queries=1),
+    'comment-list': Budget(queries=2),
+    'comment-detail': Budget(queries=2),
+    'follow-list': Budget(queries=1),
+    'follow-detail': Budget(queries=1),
+    'like': Budget(queries=5),
+    'post-batch': Budget(queries=19),
+    'comment-batch': Budget(queries=6),
+    'follow-batch': Budget(queries=12),
+}
+
+
+class ApiBudgetTestCase(BudgetTestMixin, APITestCase):
+    """Эндпоинты API укладываются в бюджет запросов и времени."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        authors = [
+            User.objects.create_user(username=f'{AUTHOR}{i}')
+            for i in range(PAGE_SIZE * 2)
+        ]
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(slug=SLUG)
+        cls.post = Post.objects.create(
+            author=authors[0], text=POST_1_TEXT, group=cls.group
+        )
+        Post.objects.bulk_create(
+            Post(author=author, group=cls.group, text=POST_2_TEXT)
+            for author in authors
+        )
+        Comment.objects.bulk_create(
+            Comment(author=author, post=cls.post, text=POST_2_TEXT)
+            for author in authors
+        )
+        Follow.objects.bulk_create(
+            Follow(user=cls.reader, author=author) for author in authors
+        )
+        Like.objects.create(user=authors[1], post=cls.post)
+        cls.comment = Comment.objects.first()
+        cls.follow = Follow.objects.first()
+        cls.authors = authors
+
+    def setUp(self):
+        self.client.force_authenticate(self.reader)
+        self.newcomer = APIClient()
+        self.newcomer.force_authenticate(
+            User.objects.create_user(username='Newcomer')
+        )
+
+    def requests(self):
+        """Название URL -> запрос, который проверяется бюджетом."""
+        post_id = self.post.id
+        get = self.client.get
+        return {
+            'api-root': lambda: get(reverse('api-root')),
+            'post-list': lambda: get(POST_LIST_URL),
+            'post-detail': lambda: get(reverse('post-detail', args=[post_id])),
+            'group-list': lambda: get(reverse('group-list')),
+            'group-detail': lambda: get(
+                reverse('group-detail', args=[self.group.id])),
+            'comment-list': lambda: get(
+                reverse('comment-list', args=[post_id])),
+            'comment-detail': lambda: get(
+                reverse('comment-detail', args=[post_id, self.comment.id])),
+            'follow-list': lambda: get(reverse('follow-list')),
+            'follow-detail': lambda: get(
+                reverse('follow-detail', args=[self.follow.id])),
+            'like': lambda: self.client.post(
+                reverse('like', args=[post_id])),
+            'post-batch': lambda: self.client.post(
+                reverse('post-batch'), [
+                    {'text': POST_1_TEXT, 'group': self.group.id}
+                    for _ in range(PAGE_SIZE)
+                ], format='json'),
+            'comment-batch': lambda: self.client.post(
+                reverse('comment-batch', args=[post_id]), [
+                    {'text': POST_2_TEXT} for _ in range(PAGE_SIZE)
+                ], format='json'),
+            'follow-batch': lambda: self.newcomer.post(
+                reverse('follow-batch'), [
+                    {'author': author.username}
+                    for author in self.authors[:PAGE_SIZE]
+                ], format='json'),
+        }
+
+    def test_every_endpoint_has_budget(self):
+        names = {url.name for url in router_v1.urls} | {'like'}
+        self.assertEqual(names, set(API_BUDGETS))
+        self.assertEqual(names, set(self.requests()))
+
+    def test_endpoints_within_budget(self):
+        for name, request in self.requests().items():
+            with self.subTest(url=name):
+                response = self.assertWithinBudget(API_BUDGETS[name], request)
+                self.assertLess(response.status_code, 400)
+
+
+class BatchCreateTestCase(APITestCase):
+    """Пакетное создание постов, комментариев и подписок."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR)
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.other = User.objects.create_user(username='Other')
+        cls.group = Group.objects.create(slug=SLUG)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def test_post_batch(self):
+        """Пакет постов создаётся с лентами, статистикой и поиском."""
+        AuthorStats.for_author(self.author)
+        self.client.force_authenticate(self.author)
+        response = self.client.post(reverse('post-batch'), [
+            {'text': POST_1_TEXT, 'group': self.group.id},
+            {'text': 'Пакетный пост'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        ids = [item['id'] for item in response.data]
+        posts = Post.objects.filter(id__in=ids).order_by('id')
+        self.assertEqual(
+            [post.text for post in posts], [POST_1_TEXT, 'Пакетный пост']
+        )
+        self.assertEqual(
+            AuthorStats.for_author(self.author).posts_count, 2
+        )
+        self.assertEqual(TimelineEntry.objects.filter(
+            user=self.reader, post_id__in=ids
+        ).count(), 2)
+        self.assertEqual(
+            list(search.search(Post.objects.all(), 'пакетный')), [posts[1]]
+        )
+
+    def test_comment_batch_updates_counter(self):
+        post = Post.objects.create(author=self.author, text=POST_1_TEXT)
+        self.client.force_authenticate(self.reader)
+        response = self.client.post(
+            reverse('comment-batch', args=[post.id]),
+            [{'text': POST_2_TEXT}] * 3, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 3)
+
+    def test_follow_batch_validated_together(self):
+        """Ошибки возвращаются по элементам, а пакет не создаётся."""
+        self.client.force_authenticate(self.reader)
+        response = self.client.post(reverse('follow-batch'), [
+            {'author': 'Other'},
+            {'author': AUTHOR},
+            {'author': 'Other'},
+            {'author': 'Reader'},
+            {'author': 'Nobody'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.data
+        self.assertEqual(errors[0], {})
+        self.assertIn('non_field_errors', errors[1])
+        self.assertIn('non_field_errors', errors[2])
+        self.assertIn('author', errors[3])
+        self.assertIn('author', errors[4])
+        self.assertFalse(Follow.objects.filter(author=self.other).exists())
+
+    def test_follow_batch(self):
+        self.client.force_authenticate(self.other)
+        response = self.client.post(reverse('follow-batch'), [
+            {'author': AUTHOR}, {'author': 'Reader'}
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Follow.objects.filter(user=self.other).count(), 2)
+        self.assertEqual(
+            AuthorStats.for_author(self.other).following_count, 2
+        )
+
+    def test_batch_size_is_bounded(self):
+        self.client.force_authenticate(self.author)
+        response = self.client.post(
+            reverse('post-batch'),
+            [{'text': POST_1_TEXT}] * (BATCH_MAX_SIZE + 1), format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Post.objects.exists())
+
+
+class StreamingListTestCase(APITestCase):
+    """Потоковая выдача всего списка без пагинации."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR)
+        cls.post = Post.objects.create(author=cls.author, text=POST_1_TEXT)
+        Comment.objects.bulk_create(
+            Comment(author=cls.author, post=cls.post, text=POST_2_TEXT)
+            for _ in range(MAX_PAGE_SIZE + 5)
+        )
+        cls.COMMENT_LIST_URL = reverse('comment-list', args=[cls.post.id])
+
+    def expected(self):
+        return CommentSerializer(
+            self.post.comments.select_related('author').order_by('id'),
+            many=True
+        ).data
+
+    def test_ndjson(self):
+        """NDJSON: объект на строку, весь список двумя запросами."""
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                self.COMMENT_LIST_URL, {'format': 'ndjson'}
+            )
+            content = b''.join(response.streaming_content)
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            response['Content-Type'], 'application/x-ndjson; charset=utf-8'
+        )
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(rows, self.expected())
+
+    def test_json_stream(self):
+        response = self.client.get(
+            self.COMMENT_LIST_URL, {'format': 'json-stream'}
+        )
+        rows = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(rows, self.expected())
+
+    @mock.patch.object(PostViewSet, 'stream_limit', 2)
+    def test_posts_stream_is_capped(self):
+        """Поток постов ограничен последними stream_limit постами для всех,
+        кроме персонала."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=POST_2_TEXT) for _ in range(3)
+        )
+
+        def streamed_ids():
+            response = self.client.get(POST_LIST_URL, {'format': 'ndjson'})
+            return [
+                json.loads(line)['id']
+                for line in b''.join(response.streaming_content).splitlines()
+            ]
+
+        newest = list(Post.objects.order_by(
+            '-created', '-id'
+        ).values_list('id', flat=True))
+        self.assertEqual(streamed_ids(), newest[:2])
+        self.client.force_authenticate(self.author)
+        self.assertEqual(streamed_ids(), newest[:2])
+        self.client.force_authenticate(
+            User.objects.create_user(username='Staff', is_staff=True)
+        )
+        self.assertEqual(streamed_ids(), newest)
+
+    def test_detail_in_ndjson(self):
+        response = self.client.get(
+            reverse('post-detail', args=[self.post.id]), {'format': 'ndjson'}
+        )
+        self.assertEqual(
+            json.loads(response.content), PostSerializer(self.post).data
+        )
+
+
+class ConditionalGetTestCase(APITestCase):
+    """ETag и Last-Modified деталей и страниц списков."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR)
+        cls.post = Post.objects.create(author=cls.author, text=POST_1_TEXT)
+        cls.comment = Comment.objects.create(
+            author=cls.author, post=cls.post, text=POST_2_TEXT
+        )
+        cls.urls = [
+            POST_LIST_URL,
+            reverse('post-detail', args=[cls.post.id]),
+            reverse('comment-list', args=[cls.post.id]),
+            reverse('comment-detail', args=[cls.post.id, cls.comment.id]),
+        ]
+        # комментариям нужен ещё запрос поста из адреса
+        cls.queries = [1, 1, 2, 2]
+
+    def test_not_modified(self):
+        """На актуальный валидатор - 304 без сериализации."""
+        for url, queries in zip(self.urls, self.queries):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                with self.assertNumQueries(queries):
+                    not_modified = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    )
+                self.assertEqual(
+                    not_modified.status_code, status.HTTP_304_NOT_MODIFIED
+                )
+                self.assertEqual(not_modified.content, b'')
+                self.assertEqual(self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                ).status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_changes_reset_validators(self):
+        """Правка комментария и новый пост меняют ETag."""
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        Comment.objects.get(id=self.comment.id).save()
+        Post.objects.create(author=self.author, text=POST_2_TEXT)
+        for url in self.urls[2:] + self.urls[:1]:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                ).status_code, status.HTTP_200_OK)
+
+    def test_format_changes_etag(self):
+        json_etag = self.client.get(self.urls[1])['ETag']
+        api_etag = self.client.get(self.urls[1], {'format': 'api'})['ETag']
+        self.assertNotEqual(json_etag, api_etag)
@@ -1,46 +1,165 @@
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 
 from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
 from rest_framework.filters import SearchFilter
-from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 
+from api.filters import PostFilter, PostOrderingFilter, PostSearchFilter
+from api.pagination import (
+    CommentPagination, FollowPagination, GroupPagination, PostPagination,
+    SearchPagination
+)
 from api.permissions import AuthorOrReadOnly, OwnerOrReadOnly
+from api.renderers import (
+    STREAM_CHUNK_SIZE, STREAM_POSTS_LIMIT, NDJSONRenderer,
+    StreamingJSONRenderer, StreamingRenderer
+)
 from api.serializers import (
     CommentSerializer, FollowSerializer, GroupSerializer, LikeSerializer,
     PostSerializer
 )
+from core.conditional import conditional, make_etag
+from posts import caching
 from posts.models import Group, Like, Post
 
 
+class StreamingListMixin:
+    """Список целиком и без пагинации при ?format=ndjson или json-stream:
+    объекты читаются курсором и сериализуются по одному. Для неограниченных
+    таблиц stream_limit задаёт потолок числа строк для всех, кроме
+    персонала."""
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [
+        NDJSONRenderer, StreamingJSONRenderer
+    ]
+    stream_limit = None
+
+    def list(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, StreamingRenderer):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.stream_limit is not None and not request.user.is_staff:
+            queryset = queryset[:self.stream_limit]
+        serializer = self.get_serializer()
+        rows = (
+            serializer.to_representation(instance)
+            for instance in queryset.iterator(chunk_size=STREAM_CHUNK_SIZE)
+        )
+        return StreamingHttpResponse(
+            renderer.render(rows),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
+
+
+class ConditionalMixin:
+    """ETag и Last-Modified по (id, updated) отдаваемых строк: на
+    актуальные If-None-Match/If-Modified-Since ответ 304 без
+    сериализации."""
+
+    def validators(self, rows, *changed):
+        request = self.request
+        etag = make_etag(
+            request.get_full_path(), request.accepted_renderer.format,
+            request.user.pk, [(row.id, row.updated) for row in rows]
+        )
+        return etag, max(
+            [row.updated for row in rows] + list(changed), default=None
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag, last_modified = self.validators([instance])
+        return conditional(request, etag, last_modified, lambda: Response(
+            self.get_serializer(instance).data
+        ))
+
+    def list(self, request, *args, **kwargs):
+        if isinstance(request.accepted_renderer, StreamingRenderer):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        rows = list(queryset) if page is None else page
+        # удалённые строки дат не оставляют - их учитывает время index
+        etag, last_modified = self.validators(
+            rows, caching.changed_at('index')
+        )
+
+        def build():
+            data = self.get_serializer(rows, many=True).data
+            if page is None:
+                return Response(data)
+            return self.get_paginated_response(data)
+        return conditional(request, etag, last_modified, build)
+
+
+class BatchCreateMixin:
+    """POST <список>/batch/ - создание пакета объектов одним запросом."""
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
 class ListCreateDeleteViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin,
                               mixins.CreateModelMixin, viewsets.GenericViewSet,
                               mixins.DestroyModelMixin):
     pass
 
 
-class GroupViewSet(viewsets.ReadOnlyModelViewSet):
+class GroupViewSet(StreamingListMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Group.objects.all()
     serializer_class = GroupSerializer
+    pagination_class = GroupPagination
 
 
-class PostViewSet(viewsets.ModelViewSet):
-    queryset = Post.objects.all()
+class PostViewSet(ConditionalMixin, StreamingListMixin, BatchCreateMixin,
+                  viewsets.ModelViewSet):
+    queryset = Post.objects.select_related('author').only(
+        'id', 'text', 'image', 'group', 'created', 'updated',
+        'author__username'
+    )
     serializer_class = PostSerializer
     permission_classes = (AuthorOrReadOnly,)
-    pagination_class = LimitOffsetPagination
+    pagination_class = PostPagination
+    filter_backends = (PostOrderingFilter, PostFilter, PostSearchFilter)
+    ordering_fields = ('created',)
+    ordering = ('-created', '-id')
+    stream_limit = STREAM_POSTS_LIMIT
+
+    @property
+    def paginator(self):
+        # курсор требует порядка по дате, а поиск упорядочен по релевантности
+        if not hasattr(self, '_paginator'):
+            searching = (self.request is not None and PostSearchFilter.
+                         search_param in self.request.query_params)
+            self._paginator = (
+                SearchPagination() if searching else self.pagination_class()
+            )
+        return self._paginator
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalMixin, StreamingListMixin,
+                     BatchCreateMixin, viewsets.ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = (AuthorOrReadOnly,)
+    pagination_class = CommentPagination
 
     def get_queryset(self):
-        return self.get_current_post().comments.all()
+        return self.get_current_post().comments.select_related(
+            'author'
+        ).only(
+            'id', 'text', 'post', 'created', 'updated', 'author__username'
+        )
 
     def perform_create(self, serializer):
         serializer.save(
@@ -52,14 +171,18 @@ class CommentViewSet(viewsets.ModelViewSet):
         return get_object_or_404(Post, id=self.kwargs.get('post_id'))
 
 
-class FollowViewSet(ListCreateDeleteViewSet):
+class FollowViewSet(StreamingListMixin, BatchCreateMixin,
+                    ListCreateDeleteViewSet):
     serializer_class = FollowSerializer
     permission_classes = (OwnerOrReadOnly,)
+    pagination_class = FollowPagination
     filter_backends = (SearchFilter,)
-    search_fields = ('^following__username',)
+    search_fields = ('^author__username',)
 
     def get_queryset(self):
-        return self.request.user.follower
+        return self.request.user.follower.select_related(
+            'user', 'author'
+        ).only('id', 'user__username', 'author__username')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -0,0 +1,73 @@
+"""Обслуживание приложения WSGI сервером ASGI через ограниченный пул потоков.
+
+Django 2.2 не поддерживает асинхронные представления, поэтому запрос
+проходит через asgiref: тело запроса принимается в цикле событий, а
+представление вместе с ORM выполняется в пуле из max_workers потоков.
+Сообщения ответа поток передаёт обратно в цикл событий сервера. Медленно
+присылающий запрос клиент занимает только корутину, а число одновременных
+обращений к БД (и соединений) не больше размера пула.
+"""
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+
+class PooledWsgiToAsgiInstance(WsgiToAsgiInstance):
+    executor = None
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await super().__call__(scope, receive, send)
+
+    async def run_wsgi_app(self, body):
+        loop = asyncio.get_running_loop()
+        # send принадлежит циклу сервера: из потока пула сообщения
+        # отправляются в этот цикл, поток ждёт их доставки
+        self.sync_send = lambda message: asyncio.run_coroutine_threadsafe(
+            self.send(message), loop
+        ).result()
+        context = contextvars.copy_context()
+        await loop.run_in_executor(
+            self.executor, functools.partial(context.run, self.serve, body)
+        )
+
+    def serve(self, body):
+        """Выполняет приложение WSGI в потоке пула. Ответ закрывается
+        явно: по close() Django рассылает request_finished и закрывает
+        соединения с БД."""
+        environ = self.build_environ(self.scope, body)
+        response = self.wsgi_application(environ, self.start_response)
+        try:
+            for output in response:
+                self.start()
+                self.sync_send({
+                    'type': 'http.response.body',
+                    'body': output,
+                    'more_body': True
+                })
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+        self.start()
+        self.sync_send({'type': 'http.response.body'})
+
+    def start(self):
+        if not self.response_started:
+            self.response_started = True
+            self.sync_send(self.response_start)
+
+
+class PooledWsgiToAsgi(WsgiToAsgi):
+    def __init__(self, wsgi_application, max_workers):
+        super().__init__(wsgi_application)
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='asgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        instance = PooledWsgiToAsgiInstance(self.wsgi_application)
+        instance.executor = self.executor
+        await instance(scope, receive, send)
@@ -0,0 +1,44 @@
+"""Условные GET-запросы: ETag, Last-Modified и ответ 304.
+
+Валидаторы считаются до отрисовки шаблона или сериализации, поэтому
+ответ 304 обходится без них.
+"""
+from hashlib import md5
+
+from django.middleware.csrf import get_token
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, quote_etag
+)
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    return quote_etag(md5(repr(parts).encode()).hexdigest())
+
+
+def csrf_secret(request):
+    """Секрет CSRF клиента - часть состояния страниц с формами: после его
+    смены (например, при повторном входе) кэш браузера с прежним токеном
+    в форме устаревает. Маскированный токен меняется при каждом вызове
+    get_token, поэтому в ETag идёт сам секрет."""
+    get_token(request)
+    return request.META.get('CSRF_COOKIE')
+
+
+def conditional(request, etag, last_modified, build):
+    """304, если If-None-Match или If-Modified-Since клиента актуальны,
+    иначе ответ build(). Оба ответа получают ETag и Last-Modified."""
+    timestamp = last_modified and int(last_modified.timestamp())
+    response = get_conditional_response(
+        request, etag=etag, last_modified=timestamp
+    )
+    if response is None:
+        response = build()
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if timestamp:
+            response['Last-Modified'] = http_date(timestamp)
+        # страницы зависят от пользователя: браузер хранит их у себя
+        # и перепроверяет при каждом обращении
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,10 @@
+from django.db import connection
+
+
+def query_plan(queryset):
+    """План выполнения запроса SQLite (EXPLAIN QUERY PLAN) одной строкой:
+    шаги плана через « | »."""
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return ' | '.join(row[-1] for row in cursor.fetchall())
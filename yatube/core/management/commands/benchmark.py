@@ -0,0 +1,127 @@
+import json
+import math
+from statistics import mean
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.metrics import measure
+from posts.models import Follow, Group, Post, User
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, percent):
+    """Процентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    rank = math.ceil(percent / 100 * len(ordered))
+    return ordered[max(rank, 1) - 1]
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет запросы к основным страницам и API через тестовый '
+            'клиент и печатает JSON с p50/p95/p99 времени ответа и числом '
+            'SQL-запросов. Данные готовит команда seed_data.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='замеров на каждый адрес'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=3,
+            help='запросов на прогрев перед замерами'
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='очищать кэш перед каждым запросом'
+        )
+        parser.add_argument('--output', help='файл для JSON-отчёта')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должно быть больше нуля.')
+        client = self.client()
+        report = {
+            'requests': options['requests'],
+            'cold': options['cold'],
+            'endpoints': {
+                name: self.run(client, url, options)
+                for name, url in self.urls().items()
+            },
+        }
+        data = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(data)
+        self.stdout.write(data)
+
+    def targets(self):
+        """Самые нагруженные объекты: автор с наибольшим числом
+        подписчиков, читатель с наибольшим числом подписок, горячий пост."""
+        def busiest(field):
+            return Follow.objects.values(field).annotate(
+                total=Count('id')
+            ).order_by('-total').values_list(field, flat=True).first()
+        post = Post.objects.order_by('-like_count', '-comment_count').first()
+        if post is None:
+            raise CommandError('Нет постов: сначала запустите seed_data.')
+        author = busiest('author') or post.author_id
+        reader = busiest('user') or post.author_id
+        return author, reader, post
+
+    def client(self):
+        author_id, reader_id, self.post = self.targets()
+        self.author = User.objects.get(id=author_id)
+        reader = User.objects.get(id=reader_id)
+        client = APIClient()
+        client.force_login(reader)
+        client.force_authenticate(reader)
+        return client
+
+    def urls(self):
+        post_id = self.post.id
+        group = Group.objects.order_by('id').first()
+        urls = {
+            'index': reverse('posts:index'),
+            'profile': reverse('posts:profile', args=[self.author.username]),
+            'post_detail': reverse('posts:post_detail', args=[post_id]),
+            'follow_index': reverse('posts:follow_index'),
+            'api:post-list': reverse('post-list'),
+            'api:post-detail': reverse('post-detail', args=[post_id]),
+            'api:group-list': reverse('group-list'),
+            'api:comment-list': reverse('comment-list', args=[post_id]),
+            'api:follow-list': reverse('follow-list'),
+        }
+        if group is not None:
+            urls['api:group-detail'] = reverse(
+                'group-detail', args=[group.id]
+            )
+        return urls
+
+    def run(self, client, url, options):
+        for _ in range(options['warmup']):
+            self.get(client, url)
+        latencies, queries = [], []
+        for _ in range(options['requests']):
+            if options['cold']:
+                cache.clear()
+            with measure() as measurement:
+                self.get(client, url)
+            latencies.append(measurement.total_time * 1000)
+            queries.append(measurement.queries)
+        result = {'url': url}
+        for percent in PERCENTILES:
+            result[f'p{percent}_ms'] = round(percentile(latencies, percent), 3)
+        result['queries_per_request'] = round(mean(queries), 2)
+        result['max_queries'] = max(queries)
+        return result
+
+    def get(self, client, url):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'{url}: ответ {response.status_code}')
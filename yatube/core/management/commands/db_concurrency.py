@@ -0,0 +1,125 @@
+import json
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from core.management.commands.benchmark import PERCENTILES, percentile
+from posts.models import Comment, Post, User
+
+FEED_SIZE = 10
+
+
+class Command(BaseCommand):
+    help = ('Читает ленту в нескольких потоках, пока другие потоки пишут '
+            'комментарии, и печатает JSON с пропускной способностью чтения '
+            'и записи, задержками чтения и числом ошибок блокировки. '
+            'Профили БД сравниваются запуском с DB_PROFILE=production '
+            'и без него.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--readers', type=int, default=4, help='потоков чтения'
+        )
+        parser.add_argument(
+            '--writers', type=int, default=1, help='потоков записи'
+        )
+        parser.add_argument(
+            '--duration', type=float, default=5.0, help='длительность, с'
+        )
+        parser.add_argument('--output', help='файл для JSON-отчёта')
+
+    def handle(self, *args, **options):
+        if options['readers'] < 1 or options['duration'] <= 0:
+            raise CommandError(
+                'Нужен хотя бы один поток чтения и положительная '
+                'длительность.'
+            )
+        self.post_ids = list(Post.objects.values_list('id', flat=True)[:100])
+        self.user_ids = list(User.objects.values_list('id', flat=True)[:100])
+        if not self.post_ids:
+            raise CommandError('Нет постов: сначала запустите seed_data.')
+        self.deadline = time.monotonic() + options['duration']
+        reads = [self.stats() for _ in range(options['readers'])]
+        writes = [self.stats() for _ in range(options['writers'])]
+        threads = [
+            threading.Thread(target=self.worker, args=(self.read, stats))
+            for stats in reads
+        ] + [
+            threading.Thread(target=self.worker, args=(self.write, stats))
+            for stats in writes
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        data = json.dumps(
+            self.report(reads, writes, options), ensure_ascii=False, indent=2
+        )
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(data)
+        self.stdout.write(data)
+
+    @staticmethod
+    def stats():
+        return {'done': 0, 'errors': 0, 'latencies': []}
+
+    def worker(self, operation, stats):
+        """Повторяет operation до срока; у потока своё соединение с БД."""
+        try:
+            while time.monotonic() < self.deadline:
+                started = time.perf_counter()
+                try:
+                    operation()
+                except OperationalError:
+                    stats['errors'] += 1
+                    continue
+                stats['latencies'].append(
+                    (time.perf_counter() - started) * 1000
+                )
+                stats['done'] += 1
+        finally:
+            connection.close()
+
+    def read(self):
+        list(Post.objects.select_related('author', 'group')[:FEED_SIZE])
+
+    def write(self):
+        Comment.objects.create(
+            post_id=random.choice(self.post_ids),
+            author_id=random.choice(self.user_ids),
+            text='Комментарий нагрузочного прогона'
+        )
+
+    def report(self, reads, writes, options):
+        duration = options['duration']
+        report = {
+            'profile': settings.DB_PROFILE,
+            'journal_mode': self.journal_mode(),
+            'readers': options['readers'],
+            'writers': options['writers'],
+            'duration_s': duration,
+        }
+        for name, group in (('reads', reads), ('writes', writes)):
+            latencies = [
+                latency for stats in group for latency in stats['latencies']
+            ]
+            report[f'{name}_per_s'] = round(
+                sum(stats['done'] for stats in group) / duration, 1
+            )
+            report[f'{name}_errors'] = sum(stats['errors'] for stats in group)
+            for percent in PERCENTILES:
+                report[f'{name}_p{percent}_ms'] = (
+                    round(percentile(latencies, percent), 3)
+                    if latencies else None
+                )
+        return report
+
+    def journal_mode(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            return cursor.fetchone()[0]
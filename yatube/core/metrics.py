@@ -0,0 +1,156 @@
+"""Замер стоимости обработки запроса: число и время SQL-запросов, время
+отрисовки шаблонов, попадания и промахи кэша и общее время.
+
+    with measure() as measurement:
+        client.get(url)
+    measurement.queries, measurement.db_time, measurement.render_time
+"""
+import threading
+from contextlib import ExitStack, contextmanager
+from time import perf_counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.base import Template
+
+_state = threading.local()
+_lock = threading.Lock()
+_patched = []
+_active = 0
+
+
+class Measurement:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.total_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._render_depth = 0
+        self._cache_depth = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += perf_counter() - start
+            self.queries += 1
+
+    def as_dict(self):
+        """Время - в миллисекундах."""
+        return {
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 3),
+            'render_ms': round(self.render_time * 1000, 3),
+            'total_ms': round(self.total_time * 1000, 3),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+
+def _timed_render(render):
+    def wrapper(self, context):
+        measurement = getattr(_state, 'measurement', None)
+        if measurement is None or measurement._render_depth:
+            # вложенные шаблоны (include, extends) уже учтены внешним
+            return render(self, context)
+        measurement._render_depth += 1
+        start = perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            measurement.render_time += perf_counter() - start
+            measurement._render_depth -= 1
+    return wrapper
+
+
+def _counted_get(get):
+    def wrapper(self, key, default=None, version=None):
+        value = get(self, key, default, version)
+        measurement = getattr(_state, 'measurement', None)
+        if measurement is not None and not measurement._cache_depth:
+            if value is default:
+                measurement.cache_misses += 1
+            else:
+                measurement.cache_hits += 1
+        return value
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    def wrapper(self, keys, version=None):
+        measurement = getattr(_state, 'measurement', None)
+        if measurement is None or measurement._cache_depth:
+            return get_many(self, keys, version)
+        keys = list(keys)
+        # get_many базового класса читает через get: не считаем дважды
+        measurement._cache_depth += 1
+        try:
+            found = get_many(self, keys, version)
+        finally:
+            measurement._cache_depth -= 1
+        measurement.cache_hits += len(found)
+        measurement.cache_misses += len(keys) - len(found)
+        return found
+    return wrapper
+
+
+def _targets():
+    """Что оборачивается на время замера: отрисовка шаблонов и чтение у
+    классов всех настроенных бэкендов кэша."""
+    targets = [(Template, 'render', _timed_render)]
+    for backend_class in {type(caches[alias]) for alias in settings.CACHES}:
+        targets.append((backend_class, 'get', _counted_get))
+        targets.append((backend_class, 'get_many', _counted_get_many))
+    return targets
+
+
+@contextmanager
+def _instrumented():
+    """Обёртки ставятся первым активным замером и снимаются последним:
+    вне замеров классы Django остаются нетронутыми. Обёртки считают
+    только в потоке, где идёт замер."""
+    global _active
+    with _lock:
+        if not _patched:
+            for owner, name, wrap in _targets():
+                original = owner.__dict__.get(name)
+                _patched.append((owner, name, original))
+                setattr(owner, name, wrap(getattr(owner, name)))
+        _active += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _active -= 1
+            if not _active:
+                for owner, name, original in reversed(_patched):
+                    if original is None:
+                        delattr(owner, name)
+                    else:
+                        setattr(owner, name, original)
+                _patched.clear()
+
+
+@contextmanager
+def measure(using=None):
+    """Замеряет код внутри блока в текущем потоке. Запросы считаются по
+    всем псевдонимам БД (using=None), включая реплики."""
+    measurement = Measurement()
+    previous = getattr(_state, 'measurement', None)
+    _state.measurement = measurement
+    start = perf_counter()
+    try:
+        with ExitStack() as stack:
+            stack.enter_context(_instrumented())
+            for alias in (list(connections) if using is None else using):
+                stack.enter_context(connections[alias].execute_wrapper(
+                    measurement.record_query
+                ))
+            yield measurement
+    finally:
+        measurement.total_time = perf_counter() - start
+        _state.measurement = previous
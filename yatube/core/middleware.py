@@ -0,0 +1,106 @@
+"""Выборочное профилирование запросов.
+
+Замеряется доля запросов PROFILING_SAMPLE_RATE: число и время SQL-запросов,
+отрисовка шаблонов, попадания и промахи кэша. Итоги копятся по именам
+представлений в памяти процесса и отдаются страницей статистики, а ответ
+на замеренный запрос получает заголовок Server-Timing. Незамеренный запрос
+стоит одного вызова random().
+
+ReplicaStickinessMiddleware закрепляет за клиентом основную БД на время
+после записи (см. core.routers).
+"""
+import random
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+from core import routers
+from core.metrics import measure
+
+UNRESOLVED = '<unresolved>'
+# cookie с моментом, до которого клиент читает из основной БД
+PIN_COOKIE = 'primary_until'
+STAT_FIELDS = (
+    'queries', 'db_ms', 'render_ms', 'total_ms', 'cache_hits', 'cache_misses'
+)
+
+_lock = threading.Lock()
+_stats = defaultdict(lambda: dict.fromkeys(('count',) + STAT_FIELDS, 0))
+
+
+def record(view_name, cost):
+    with _lock:
+        stats = _stats[view_name]
+        stats['count'] += 1
+        for field in STAT_FIELDS:
+            stats[field] += cost[field]
+
+
+def snapshot():
+    """Средние значения по представлениям с момента запуска процесса."""
+    with _lock:
+        return {
+            view_name: {
+                'count': stats['count'],
+                **{
+                    field: round(stats[field] / stats['count'], 3)
+                    for field in STAT_FIELDS
+                },
+            }
+            for view_name, stats in _stats.items()
+        }
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def server_timing(cost):
+    return ', '.join((
+        f'db;dur={cost["db_ms"]};desc="SQL x{cost["queries"]}"',
+        f'render;dur={cost["render_ms"]}',
+        f'cache;desc="hit {cost["cache_hits"]} miss {cost["cache_misses"]}"',
+        f'total;dur={cost["total_ms"]}',
+    ))
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # читается при каждом запросе: долю можно менять без перезапуска,
+        # в том числе через override_settings в тестах
+        if random.random() >= getattr(settings, 'PROFILING_SAMPLE_RATE', 0):
+            return self.get_response(request)
+        with measure() as measurement:
+            response = self.get_response(request)
+        cost = measurement.as_dict()
+        match = getattr(request, 'resolver_match', None)
+        record(match.view_name if match else UNRESOLVED, cost)
+        response['Server-Timing'] = server_timing(cost)
+        return response
+
+
+class ReplicaStickinessMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.reset()
+        try:
+            pinned_until = float(request.COOKIES.get(PIN_COOKIE, 0))
+        except ValueError:
+            pinned_until = 0
+        if pinned_until > time.time():
+            routers.pin_primary(pinned_until)
+        response = self.get_response(request)
+        if routers.has_written():
+            response.set_cookie(
+                PIN_COOKIE, str(time.time() + settings.REPLICA_PIN_SECONDS),
+                max_age=settings.REPLICA_PIN_SECONDS, httponly=True
+            )
+        return response
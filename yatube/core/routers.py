@@ -0,0 +1,71 @@
+"""Чтение с реплик, запись в основную БД.
+
+Чтения уходят на реплику из settings.DATABASE_REPLICAS, выбранную один раз
+на запрос (reset), запись и всё внутри транзакций - в default. После
+записи поток REPLICA_PIN_SECONDS читает из default, а
+ReplicaStickinessMiddleware переносит это закрепление на следующие запросы
+того же клиента: реплика могла ещё не получить изменения, а автор должен
+сразу увидеть свой пост (read-your-writes). Закрепление ограничено по
+времени, поэтому потоки команд и фоновых задач не остаются на default
+навсегда.
+"""
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+PRIMARY = 'default'
+
+_state = threading.local()
+
+
+def pin_primary(until=None):
+    """Читать из default до момента until (по умолчанию - на
+    REPLICA_PIN_SECONDS от текущего)."""
+    _state.pinned_until = until or time.time() + settings.REPLICA_PIN_SECONDS
+
+
+def reset():
+    """Начало нового запроса или задачи: без закрепления, записи и
+    выбранной реплики."""
+    _state.pinned_until = 0
+    _state.written = False
+    _state.replica = None
+
+
+def is_pinned():
+    return getattr(_state, 'pinned_until', 0) > time.time()
+
+
+def has_written():
+    return getattr(_state, 'written', False)
+
+
+def replica():
+    """Реплика текущего запроса: все его чтения видят одно состояние."""
+    current = getattr(_state, 'replica', None)
+    if current not in settings.DATABASE_REPLICAS:
+        current = _state.replica = random.choice(settings.DATABASE_REPLICAS)
+    return current
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (not settings.DATABASE_REPLICAS or is_pinned()
+                or connections[PRIMARY].in_atomic_block):
+            return PRIMARY
+        return replica()
+
+    def db_for_write(self, model, **hints):
+        pin_primary()
+        _state.written = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # реплики содержат те же данные, что и основная БД
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
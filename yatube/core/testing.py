@@ -0,0 +1,49 @@
+from collections import namedtuple
+
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+from core.metrics import measure
+
+# Бюджет страницы: число SQL-запросов (строго) и потолки времени в мс.
+Budget = namedtuple(
+    'Budget', ('queries', 'db_ms', 'render_ms'), defaults=(100, 500)
+)
+
+
+class BudgetTestMixin:
+    """Проверка запроса на соответствие бюджету Budget."""
+
+    def assertWithinBudget(self, budget, request):
+        with measure() as measurement:
+            response = request()
+        cost = measurement.as_dict()
+        self.assertLessEqual(
+            cost['queries'], budget.queries, f'Превышен бюджет: {cost}'
+        )
+        self.assertLessEqual(
+            cost['db_ms'], budget.db_ms, f'Превышен бюджет: {cost}'
+        )
+        self.assertLessEqual(
+            cost['render_ms'], budget.render_ms, f'Превышен бюджет: {cost}'
+        )
+        return response
+
+
+class TestRunner(DiscoverRunner):
+    """Тесты работают с кэшем в памяти процесса: файловый кэш из настроек
+    общий с запущенным сервером и переживает прогон, а записи одного теста
+    попадали бы в другие."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.caches_override = override_settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            }
+        })
+        self.caches_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.caches_override.disable()
+        super().teardown_test_environment(**kwargs)
@@ -1,6 +1,31 @@
-from django.test import TestCase, Client
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.db import connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.template.base import Template
+from django.test import (
+    TestCase, TransactionTestCase, Client, override_settings
+)
+from django.urls import reverse
 
 from http import HTTPStatus
+from unittest import mock
+
+from core import middleware, routers
+from core.asgi import PooledWsgiToAsgi
+from core.metrics import measure
+from posts.models import AuthorStats, Post
 
 UNEXISTING_URL = '/unexisting_url/'
 
@@ -14,3 +39,306 @@ class ViewTestClass(TestCase):
         response = self.client.get(UNEXISTING_URL)
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class TestRunnerTest(TestCase):
+    def test_tests_use_memory_cache(self):
+        self.assertIsInstance(caches['default'], LocMemCache)
+
+
+class BenchmarkCommandTest(TestCase):
+    def test_benchmark_reports_percentiles(self):
+        """benchmark печатает процентили и число запросов по адресам."""
+        call_command(
+            'seed_data', users=10, groups=1, posts=20, comments=20,
+            follows=20, likes=20, stdout=StringIO()
+        )
+        out = StringIO()
+        call_command('benchmark', requests=3, warmup=0, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertIn('follow_index', report['endpoints'])
+        self.assertIn('api:post-list', report['endpoints'])
+        for result in report['endpoints'].values():
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+            self.assertGreater(result['queries_per_request'], 0)
+
+
+class ProfilingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.staff = User.objects.create_user(username='Staff', is_staff=True)
+        cls.user = User.objects.create_user(username='NoName')
+
+    def setUp(self):
+        cache.clear()
+        middleware.reset()
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampled_request_is_recorded(self):
+        """Замеренный запрос получает Server-Timing и попадает в итоги."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        stats = middleware.snapshot()['posts:index']
+        self.assertEqual(stats['count'], 1)
+        self.assertGreater(stats['queries'], 0)
+        self.assertGreater(stats['cache_misses'], 0)
+        self.client.get(reverse('posts:index'))
+        stats = middleware.snapshot()['posts:index']
+        self.assertGreater(stats['cache_hits'], 0)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_unsampled_request_is_not_recorded(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(middleware.snapshot(), {})
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_sample_rate_read_per_request(self):
+        self.client.get(reverse('posts:index'))
+        with override_settings(PROFILING_SAMPLE_RATE=1):
+            response = self.client.get(reverse('posts:index'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+
+    def test_classes_untouched_outside_measure(self):
+        """Шаблоны и кэш оборачиваются только на время замера."""
+        render, get = Template.render, type(caches['default']).get
+        with measure():
+            self.assertIsNot(Template.render, render)
+            self.assertIsNot(type(caches['default']).get, get)
+        self.assertIs(Template.render, render)
+        self.assertIs(type(caches['default']).get, get)
+
+    def test_stats_page_for_staff_only(self):
+        """Статистика профилирования доступна только персоналу."""
+        middleware.record('posts:index', dict.fromkeys(
+            middleware.STAT_FIELDS, 2
+        ))
+        url = reverse('profiling_stats')
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, HTTPStatus.FOUND)
+        self.client.force_login(self.staff)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json()['views']['posts:index']['count'], 1)
+
+
+def asgi_get(application, path):
+    """Выполняет GET через приложение ASGI, возвращает (статус, тело,
+    выполнялись ли все вызовы send в цикле событий сервера)."""
+    scope = {
+        'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'',
+        'http_version': '1.1', 'headers': []
+    }
+    sent, loops = [], set()
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        loops.add(asyncio.get_running_loop())
+        sent.append(message)
+
+    async def run():
+        await application(scope, receive, send)
+        return sent[0]['status'], b''.join(
+            message.get('body', b'') for message in sent[1:]
+        ), loops == {asyncio.get_running_loop()}
+    return run()
+
+
+class PooledAsgiTest(TestCase):
+    def test_requests_run_in_bounded_pool(self):
+        """Запросы выполняются параллельно, но не больше чем в
+        max_workers потоках."""
+        threads = set()
+
+        def slow_application(environ, start_response):
+            threads.add(threading.current_thread().name)
+            time.sleep(0.1)
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return [environ['PATH_INFO'].encode()]
+
+        application = PooledWsgiToAsgi(slow_application, max_workers=2)
+
+        async def run():
+            return await asyncio.gather(*(
+                asgi_get(application, f'/{number}/') for number in range(4)
+            ))
+        started = time.monotonic()
+        responses = asyncio.run(run())
+        self.assertLess(time.monotonic() - started, 0.35)
+        self.assertEqual(responses, [
+            (200, f'/{number}/'.encode(), True) for number in range(4)
+        ])
+        self.assertEqual(len(threads), 2)
+
+    def test_project_application(self):
+        from yatube.asgi import application
+        status, body, on_server_loop = asyncio.run(
+            asgi_get(application, UNEXISTING_URL)
+        )
+        self.assertEqual(status, HTTPStatus.NOT_FOUND)
+        self.assertIn(b'<html', body)
+        self.assertTrue(on_server_loop)
+
+
+PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 1024 * 1024,
+    'busy_timeout': 1234,
+}
+
+
+class SqlitePragmasTest(TestCase):
+    def pragmas(self):
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = DatabaseWrapper({
+                **connections.databases['default'],
+                'NAME': os.path.join(directory, 'pragmas.sqlite3')
+            }, alias='pragmas')
+            try:
+                with wrapper.cursor() as cursor:
+                    return {
+                        name: cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                        for name in PRODUCTION_PRAGMAS
+                    }
+            finally:
+                wrapper.close()
+
+    @override_settings(SQLITE_PRAGMAS=PRODUCTION_PRAGMAS)
+    def test_production_pragmas_applied(self):
+        """Новое соединение получает WAL, synchronous=NORMAL, mmap и
+        busy_timeout."""
+        self.assertEqual(self.pragmas(), {
+            'journal_mode': 'wal',
+            'synchronous': 1,
+            'mmap_size': 1024 * 1024,
+            'busy_timeout': 1234,
+        })
+
+    @override_settings(SQLITE_PRAGMAS={})
+    def test_development_keeps_defaults(self):
+        self.assertEqual(self.pragmas()['journal_mode'], 'delete')
+
+
+class DbConcurrencyCommandTest(TransactionTestCase):
+    def test_reports_throughput(self):
+        """db_concurrency читает и пишет одновременно и печатает отчёт."""
+        author = get_user_model().objects.create_user(username='author')
+        author.posts.create(text='Пост')
+        out = StringIO()
+        call_command(
+            'db_concurrency', readers=2, writers=1, duration=0.3, stdout=out
+        )
+        report = json.loads(out.getvalue())
+        self.assertGreater(report['reads_per_s'], 0)
+        for key in ('writes_per_s', 'reads_p95_ms', 'journal_mode'):
+            self.assertIn(key, report)
+
+
+REPLICA = 'test_replica'
+
+
+@override_settings(
+    DATABASE_REPLICAS=[REPLICA],
+    CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+    }}
+)
+class ReplicaRouterTest(TransactionTestCase):
+    """Реплика - отдельный файл SQLite, который sync_replica копирует из
+    основной БД; между копиями реплика отстаёт."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        connections.databases[REPLICA] = dict(
+            connections.databases['default'],
+            NAME=os.path.join(cls.directory, 'replica.sqlite3')
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def sync_replica(self):
+        primary, replica = connections['default'], connections[REPLICA]
+        primary.ensure_connection()
+        replica.ensure_connection()
+        primary.connection.backup(replica.connection)
+
+    def setUp(self):
+        self.author = get_user_model().objects.create_user(username='author')
+        AuthorStats.for_author(self.author)
+        self.client.force_login(self.author)
+        self.sync_replica()
+        self.client.cookies.pop(middleware.PIN_COOKIE, None)
+
+    def test_reads_go_to_replica_writes_to_primary(self):
+        self.author.posts.create(text='Пост')
+        routers.reset()
+        self.assertEqual(Post.objects.db, REPLICA)
+        self.assertFalse(Post.objects.exists())
+        self.assertTrue(Post.objects.using('default').exists())
+        self.sync_replica()
+        self.assertTrue(Post.objects.exists())
+
+    def test_read_your_writes(self):
+        """Автор сразу видит новый пост, остальные - после синхронизации
+        реплики."""
+        profile_url = reverse('posts:profile', args=['author'])
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'}, follow=True
+        )
+        self.assertContains(response, 'Новый пост')
+        self.assertIn(middleware.PIN_COOKIE, self.client.cookies)
+        guest = Client()
+        self.assertNotContains(guest.get(profile_url), 'Новый пост')
+        self.sync_replica()
+        self.assertContains(guest.get(profile_url), 'Новый пост')
+
+    def test_pin_expires(self):
+        """Просроченная метка в cookie не закрепляет основную БД."""
+        self.client.cookies[middleware.PIN_COOKIE] = '0'
+        self.author.posts.create(text='Пост')
+        response = self.client.get(reverse('posts:profile', args=['author']))
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_stats_rebuild_does_not_pin(self):
+        """Пересчёт статистики при чтении профиля - не запись клиента."""
+        AuthorStats.objects.all().delete()
+        self.sync_replica()
+        response = Client().get(reverse('posts:profile', args=['author']))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotIn(middleware.PIN_COOKIE, response.cookies)
+        self.assertTrue(AuthorStats.objects.using('default').exists())
+
+    def test_pin_is_bounded_in_time(self):
+        """Вне запросов (команды, фоновые задачи) закрепление после записи
+        истекает через REPLICA_PIN_SECONDS."""
+        routers.reset()
+        self.author.posts.create(text='Пост')
+        self.assertEqual(Post.objects.db, 'default')
+        with mock.patch('core.routers.time.time',
+                        return_value=time.time() + 3600):
+            self.assertEqual(Post.objects.db, REPLICA)
+
+    def test_replica_chosen_once_per_request(self):
+        routers.reset()
+        with override_settings(DATABASE_REPLICAS=[REPLICA, 'default']):
+            chosen = {Post.objects.db for _ in range(50)}
+            self.assertEqual(len(chosen), 1)
+
+    def test_measure_counts_replica_queries(self):
+        routers.reset()
+        with measure() as measurement:
+            list(Post.objects.all())
+        self.assertEqual(measurement.queries, 1)
@@ -2,7 +2,7 @@ from django.contrib import admin
 
 from rest_framework.authtoken.models import TokenProxy
 
-from posts.models import Comment, Follow, Group, Post, Like
+from posts.models import AuthorStats, Comment, Follow, Group, Post, Like
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -25,6 +25,7 @@ admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
 admin.site.register(Comment)
 admin.site.register(Follow)
+admin.site.register(AuthorStats)
 
 
 # То же, что и admin.site.register(Like)
@@ -0,0 +1,33 @@
+"""Пакетная вставка постов, комментариев и подписок.
+
+bulk_create не отправляет post_save, поэтому после вставки рассылается
+сигнал bulk_created: его обработчики в posts.signals обновляют счётчики,
+ленты, поисковый индекс и версии кэша один раз на пакет.
+"""
+from django.db import transaction
+from django.dispatch import Signal
+
+BATCH_SIZE = 500
+
+bulk_created = Signal(providing_args=['instances'])
+
+
+def bulk_create(model, objects):
+    """Вставляет объекты в одной транзакции и возвращает их с id."""
+    objects = list(objects)
+    with transaction.atomic():
+        model.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+        if objects and objects[0].pk is None:
+            fill_ids(model, objects)
+        bulk_created.send(sender=model, instances=objects)
+    return objects
+
+
+def fill_ids(model, objects):
+    """SQLite не возвращает id из bulk_create. Транзакция держит блокировку
+    записи с первой вставки, поэтому новые строки - последние по id."""
+    ids = model.objects.order_by('-id').values_list(
+        'id', flat=True
+    )[:len(objects)]
+    for obj, pk in zip(objects, reversed(ids)):
+        obj.pk = pk
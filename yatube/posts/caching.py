@@ -0,0 +1,56 @@
+"""Версии закэшированных фрагментов лент.
+
+Ключ фрагмента включает версию области (лента, сообщество, профиль).
+Изменение данных меняет версию, и старые фрагменты больше не читаются.
+"""
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from posts import settings
+
+VERSION_KEY = 'fragment_version:{}'
+CHANGED_KEY = 'fragment_changed:{}'
+
+
+def version(scope):
+    key = VERSION_KEY.format(scope)
+    current = cache.get(key)
+    if current is None:
+        cache.add(CHANGED_KEY.format(scope), timezone.now(), None)
+        cache.add(key, uuid4().hex, None)
+        current = cache.get(key)
+    return current
+
+
+def invalidate(*scopes):
+    now = timezone.now()
+    values = {}
+    for scope in scopes:
+        values[VERSION_KEY.format(scope)] = uuid4().hex
+        values[CHANGED_KEY.format(scope)] = now
+    cache.set_many(values, None)
+
+
+def changed_at(scope):
+    """Время последней смены версии области - для Last-Modified. Если
+    кэш очищен, время запоминается при первом обращении и дальше не
+    меняется до следующей смены версии."""
+    key = CHANGED_KEY.format(scope)
+    current = cache.get(key)
+    if current is None:
+        now = timezone.now()
+        cache.add(key, now, None)
+        # без кэша (DummyCache) запомнить время негде
+        current = cache.get(key) or now
+    return current
+
+
+def fragment(scope):
+    """Контекст для тега {% cache %} шаблона ленты."""
+    return {
+        'cache_timeout': settings.PAGE_CACHE_TIMEOUT,
+        'cache_version': version(scope),
+        'card_cache_timeout': settings.CARD_CACHE_TIMEOUT,
+    }
@@ -0,0 +1,317 @@
+"""Выгрузка и загрузка данных в NDJSON и CSV.
+
+Выгрузка читает таблицу курсором iterator(chunk_size) и пишет строку за
+строкой, поэтому память не зависит от объёма. Загрузка идёт пакетами через
+posts.bulk.bulk_create: каждый пакет - отдельная транзакция, производные
+данные (счётчики, ленты, поиск) обновляются сигналом bulk_created.
+Связи передаются естественными ключами: пользователи - по username,
+сообщества - по slug, посты и комментарии сохраняют свои id, поэтому
+повторная загрузка того же файла не создаёт дублей. Строка, чей id занят
+другим объектом базы, не загружается и попадает в отчёт команды.
+"""
+import csv
+import filecmp
+import json
+import os
+import shutil
+from collections import namedtuple
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from posts import bulk
+from posts.models import Comment, Follow, Group, Like, Post, User
+
+FORMATS = ('ndjson', 'csv')
+IMAGE_DIR = 'posts/'
+
+# columns: колонка файла -> поле для values_list;
+# key: колонки, по которым загрузка узнаёт уже существующую строку;
+# same: колонки, совпадение которых означает, что строка с тем же id -
+# тот же объект, а не посторонний.
+Spec = namedtuple('Spec', ('model', 'columns', 'key', 'same'))
+
+SPECS = {
+    'group': Spec(Group, {
+        'id': 'id', 'title': 'title', 'slug': 'slug',
+        'description': 'description',
+    }, ('id',), ('slug',)),
+    'post': Spec(Post, {
+        'id': 'id', 'created': 'created', 'text': 'text',
+        'author': 'author__username', 'group': 'group__slug',
+        'image': 'image',
+    }, ('id',), ('author', 'created')),
+    'comment': Spec(Comment, {
+        'id': 'id', 'created': 'created', 'text': 'text',
+        'author': 'author__username', 'post': 'post_id',
+    }, ('id',), ('author', 'post', 'created')),
+    'follow': Spec(Follow, {
+        'user': 'user__username', 'author': 'author__username',
+    }, ('user', 'author'), ()),
+    'like': Spec(Like, {
+        'user': 'user__username', 'post': 'post_id',
+    }, ('user', 'post'), ()),
+}
+
+# Результат загрузки пакета: число созданных объектов и id строк файла,
+# занятые посторонними объектами базы.
+Imported = namedtuple('Imported', ('created', 'conflicts'))
+
+
+def export_rows(name, chunk_size):
+    """Строки таблицы в виде словарей, по chunk_size за обращение к БД."""
+    spec = SPECS[name]
+    rows = spec.model.objects.order_by('pk').values_list(
+        *spec.columns.values()
+    )
+    for values in rows.iterator(chunk_size=chunk_size):
+        yield dict(zip(spec.columns, values))
+
+
+def to_text(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def write_rows(rows, stream, file_format, columns):
+    if file_format == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=list(columns))
+        writer.writeheader()
+    for row in rows:
+        row = {column: to_text(value) for column, value in row.items()}
+        if file_format == 'csv':
+            writer.writerow(row)
+        else:
+            stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+        yield row
+
+
+def nullable_columns(name):
+    spec = SPECS[name]
+    return {
+        column for column, path in spec.columns.items()
+        if spec.model._meta.get_field(path.split('__')[0]).null
+    }
+
+
+def read_rows(stream, file_format, nullable=()):
+    if file_format == 'csv':
+        for row in csv.DictReader(stream):
+            # в CSV нет null: пустая ячейка допускающей null колонки
+            # означает отсутствие значения, в остальных - пустую строку
+            yield {
+                column: None if column in nullable and not value else value
+                for column, value in row.items()
+            }
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+@contextmanager
+def keep_timestamps(model):
+    """Отключает auto_now и auto_now_add, чтобы сохранить даты из файла."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def users_by_name(names):
+    """Пользователи по именам; отсутствующие создаются без пароля."""
+    names = set(filter(None, names))
+    users = dict(User.objects.filter(
+        username__in=names
+    ).values_list('username', 'id'))
+    missing = names - set(users)
+    if missing:
+        User.objects.bulk_create(
+            User(username=name, password='!') for name in missing
+        )
+        users.update(User.objects.filter(
+            username__in=missing
+        ).values_list('username', 'id'))
+    return users
+
+
+def copy_image(name, media_from):
+    """Копирует файл изображения в MEDIA_ROOT/posts/ и возвращает имя
+    для поля image. Отсутствующий файл даёт пост без изображения."""
+    source = os.path.join(media_from, name)
+    if not os.path.isfile(source):
+        source = os.path.join(media_from, os.path.basename(name))
+        if not os.path.isfile(source):
+            return ''
+    target_name = IMAGE_DIR + os.path.basename(name)
+    target = os.path.join(settings.MEDIA_ROOT, target_name)
+    if os.path.exists(target):
+        if filecmp.cmp(source, target, shallow=False):
+            return target_name
+        # другое изображение с тем же именем: копия получает свободное имя
+        target_name = default_storage.get_available_name(target_name)
+        target = os.path.join(settings.MEDIA_ROOT, target_name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.copyfile(source, target)
+    return target_name
+
+
+def same_value(stored, value):
+    if hasattr(stored, 'isoformat'):
+        return stored == parse_datetime(value)
+    return str(stored) == str(value)
+
+
+def build_objects(name, rows, media_from=None):
+    """Объекты моделей для пакета строк без уже существующих в БД и
+    id строк, занятые посторонними объектами."""
+    spec = SPECS[name]
+    conflicts = []
+    if spec.key == ('id',):
+        existing = {
+            values[0]: values[1:]
+            for values in spec.model.objects.filter(
+                id__in=[int(row['id']) for row in rows]
+            ).values_list('id', *(spec.columns[key] for key in spec.same))
+        }
+        new_rows = []
+        for row in rows:
+            stored = existing.get(int(row['id']))
+            if stored is None:
+                new_rows.append(row)
+            elif not all(
+                same_value(value, row[key])
+                for key, value in zip(spec.same, stored)
+            ):
+                conflicts.append(int(row['id']))
+        rows = new_rows
+    return BUILDERS[name](rows, media_from), conflicts
+
+
+def build_groups(rows, media_from):
+    return [
+        Group(
+            id=row['id'], title=row['title'], slug=row['slug'],
+            description=row['description'] or ''
+        )
+        for row in rows
+    ]
+
+
+def build_posts(rows, media_from):
+    users = users_by_name(row['author'] for row in rows)
+    groups = dict(Group.objects.filter(
+        slug__in={row['group'] for row in rows if row['group']}
+    ).values_list('slug', 'id'))
+    posts = []
+    for row in rows:
+        image = row['image'] or ''
+        if image and media_from:
+            image = copy_image(image, media_from)
+        created = parse_datetime(row['created'])
+        posts.append(Post(
+            id=row['id'], created=created, updated=created,
+            text=row['text'], author_id=users[row['author']],
+            group_id=groups.get(row['group']), image=image
+        ))
+    return posts
+
+
+def existing_posts(rows):
+    return set(Post.objects.filter(
+        id__in={int(row['post']) for row in rows}
+    ).values_list('id', flat=True))
+
+
+def build_comments(rows, media_from):
+    users = users_by_name(row['author'] for row in rows)
+    posts = existing_posts(rows)
+    comments = []
+    for row in rows:
+        if int(row['post']) not in posts:
+            continue
+        created = parse_datetime(row['created'])
+        comments.append(Comment(
+            id=row['id'], created=created, updated=created,
+            text=row['text'], author_id=users[row['author']],
+            post_id=int(row['post'])
+        ))
+    return comments
+
+
+def build_follows(rows, media_from):
+    users = users_by_name(
+        name for row in rows for name in (row['user'], row['author'])
+    )
+    pairs = {
+        (users[row['user']], users[row['author']]) for row in rows
+        if row['user'] != row['author']
+    }
+    existing = set(Follow.objects.filter(
+        user_id__in={user_id for user_id, _ in pairs},
+        author_id__in={author_id for _, author_id in pairs}
+    ).values_list('user_id', 'author_id'))
+    return [
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id, author_id in pairs - existing
+    ]
+
+
+def build_likes(rows, media_from):
+    users = users_by_name(row['user'] for row in rows)
+    posts = existing_posts(rows)
+    pairs = {
+        (users[row['user']], int(row['post'])) for row in rows
+        if int(row['post']) in posts
+    }
+    existing = set(Like.objects.filter(
+        user_id__in={user_id for user_id, _ in pairs},
+        post_id__in={post_id for _, post_id in pairs}
+    ).values_list('user_id', 'post_id'))
+    return [
+        Like(user_id=user_id, post_id=post_id)
+        for user_id, post_id in pairs - existing
+    ]
+
+
+BUILDERS = {
+    'group': build_groups,
+    'post': build_posts,
+    'comment': build_comments,
+    'follow': build_follows,
+    'like': build_likes,
+}
+
+
+def import_batch(name, rows, media_from=None):
+    """Загружает пакет строк; возвращает Imported."""
+    model = SPECS[name].model
+    with transaction.atomic(), keep_timestamps(model):
+        objects, conflicts = build_objects(name, rows, media_from)
+        bulk.bulk_create(model, objects)
+    return Imported(len(objects), conflicts)
+
+
+def reset_sequences(name):
+    """После вставки явных id счётчик первичного ключа нужно сдвинуть
+    (PostgreSQL); для SQLite команд нет."""
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), [SPECS[name].model]
+    )
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
@@ -0,0 +1,63 @@
+"""Данные страницы поста за ограниченное число запросов.
+
+Пост с автором, сообществом, статистикой автора и лайком читателя
+читается одним запросом, окно первых комментариев с авторами - вторым,
+сколько бы комментариев ни было у поста. Следующие окна подгружаются
+по курсору (created, id).
+"""
+from collections import namedtuple
+
+from django.db.models import Exists, OuterRef, Q
+from django.shortcuts import get_object_or_404
+
+from posts import settings
+from posts.models import AuthorStats, Like, Post
+from posts.pagination import decode_cursor, encode_cursor
+
+PostDetail = namedtuple(
+    'PostDetail', 'post author_stats has_like comments comments_cursor'
+)
+
+
+def load_post(post_id, user):
+    posts = Post.objects.select_related('author', 'group', 'author__stats')
+    if user.is_authenticated:
+        posts = posts.annotate(has_like=Exists(
+            Like.objects.filter(post=OuterRef('pk'), user=user)
+        ))
+    return get_object_or_404(posts, id=post_id)
+
+
+def load_author_stats(author):
+    try:
+        return author.stats
+    except AuthorStats.DoesNotExist:
+        return AuthorStats.rebuild(author)
+
+
+def load_comments(post, window, cursor=None):
+    """Окно из window комментариев в порядке (created, id), начиная после
+    позиции курсора, и курсор следующего окна ('' - окно последнее)."""
+    comments = post.comments.select_related('author')
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        created, comment_id, _ = position
+        comments = comments.filter(
+            Q(created__gt=created) | Q(created=created, id__gt=comment_id)
+        )
+    comments = list(comments.order_by('created', 'id')[:window + 1])
+    if len(comments) <= window:
+        return comments, ''
+    return comments[:window], encode_cursor(comments[window - 1])
+
+
+def load_post_detail(post_id, user, window=settings.COMMENTS_PAGE):
+    post = load_post(post_id, user)
+    comments, cursor = load_comments(post, window)
+    return PostDetail(
+        post=post,
+        author_stats=load_author_stats(post.author),
+        has_like=(user != post.author and getattr(post, 'has_like', False)),
+        comments=comments,
+        comments_cursor=cursor
+    )
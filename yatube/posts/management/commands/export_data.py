@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from posts import exchange
+
+
+class Command(BaseCommand):
+    help = 'Выгружает таблицу в NDJSON или CSV потоком, без загрузки в память.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=sorted(exchange.SPECS))
+        parser.add_argument(
+            '--format', choices=exchange.FORMATS, default='ndjson'
+        )
+        parser.add_argument(
+            '--output', help='файл для выгрузки (по умолчанию - stdout)'
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        name = options['model']
+        rows = exchange.export_rows(name, options['chunk_size'])
+        columns = exchange.SPECS[name].columns
+        if options['output']:
+            with open(options['output'], 'w', newline='',
+                      encoding='utf-8') as stream:
+                total = self.write(rows, stream, options, columns)
+        else:
+            total = self.write(rows, self.stdout, options, columns)
+        self.stderr.write(f'Выгружено строк: {total}')
+
+    def write(self, rows, stream, options, columns):
+        total = 0
+        written = exchange.write_rows(rows, stream, options['format'], columns)
+        for total, _ in enumerate(written, 1):
+            if total % options['chunk_size'] == 0:
+                self.stderr.write(f'Выгружено строк: {total}', ending='\r')
+        return total
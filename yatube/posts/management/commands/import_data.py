@@ -0,0 +1,87 @@
+import json
+import os
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import exchange
+
+
+class Command(BaseCommand):
+    help = ('Загружает таблицу из NDJSON или CSV пакетами bulk_create. '
+            'После каждого пакета номер строки пишется в файл состояния, '
+            'и с ключом --resume загрузка продолжается с него.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=sorted(exchange.SPECS))
+        parser.add_argument('path', help='файл NDJSON или CSV')
+        parser.add_argument(
+            '--format', choices=exchange.FORMATS,
+            help='формат файла (по умолчанию - по расширению)'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='продолжить с места, сохранённого в файле состояния'
+        )
+        parser.add_argument(
+            '--state', help='файл состояния (по умолчанию - <path>.state)'
+        )
+        parser.add_argument(
+            '--media-from',
+            help='каталог с изображениями постов для копирования в MEDIA_ROOT'
+        )
+
+    def handle(self, *args, **options):
+        name, path = options['model'], options['path']
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'ndjson'
+        )
+        state_path = options['state'] or f'{path}.state'
+        done = self.load_state(state_path, name) if options['resume'] else 0
+        created = 0
+        conflicts = []
+        with open(path, newline='', encoding='utf-8') as stream:
+            rows = islice(exchange.read_rows(
+                stream, file_format, exchange.nullable_columns(name)
+            ), done, None)
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                imported = exchange.import_batch(
+                    name, batch, options['media_from']
+                )
+                created += imported.created
+                conflicts += imported.conflicts
+                done += len(batch)
+                self.save_state(state_path, name, done)
+                self.stderr.write(
+                    f'Обработано строк: {done}, создано: {created}'
+                )
+        exchange.reset_sequences(name)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        if conflicts:
+            self.stdout.write(self.style.WARNING(
+                'Пропущены строки, чьи id заняты другими объектами: '
+                + ', '.join(map(str, conflicts))
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено: {created} из {done} строк'
+        ))
+
+    def load_state(self, state_path, name):
+        if not os.path.exists(state_path):
+            return 0
+        with open(state_path) as state_file:
+            state = json.load(state_file)
+        if state['model'] != name:
+            raise CommandError(
+                f'Файл состояния относится к загрузке {state["model"]}.'
+            )
+        return state['done']
+
+    def save_state(self, state_path, name, done):
+        with open(state_path, 'w') as state_file:
+            json.dump({'model': name, 'done': done}, state_file)
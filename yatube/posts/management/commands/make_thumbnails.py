@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import make_thumbnail
+
+
+class Command(BaseCommand):
+    help = 'Строит недостающие миниатюры изображений постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='перестроить миниатюры всех постов с изображениями'
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(thumbnail='')
+        done = 0
+        for post_id in posts.values_list('id', flat=True).iterator():
+            make_thumbnail(post_id)
+            done += 1
+        self.stdout.write(self.style.SUCCESS(f'Построено миниатюр: {done}'))
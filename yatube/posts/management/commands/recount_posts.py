@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import AuthorStats, Post
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики комментариев и лайков у постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'post_ids', nargs='*', type=int,
+            help='id постов для пересчёта (по умолчанию - все посты)'
+        )
+        parser.add_argument(
+            '--authors', action='store_true',
+            help='пересчитать и статистику авторов'
+        )
+
+    def handle(self, *args, **options):
+        queryset = Post.objects.all()
+        if options['post_ids']:
+            queryset = queryset.filter(id__in=options['post_ids'])
+        updated = Post.recount(queryset)
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересчитаны счётчики постов: {updated}')
+        )
+        if options['authors']:
+            updated = AuthorStats.recount()
+            self.stdout.write(self.style.SUCCESS(
+                f'Пересчитана статистика авторов: {updated}'
+            ))
@@ -0,0 +1,190 @@
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts import search, timeline
+from posts.exchange import keep_timestamps
+from posts.models import (
+    AuthorStats, Comment, Follow, Group, Like, Post, User
+)
+
+TEXT_WORDS = (
+    'город', 'утро', 'новости', 'котик', 'проект', 'поездка', 'книга',
+    'музыка', 'футбол', 'погода', 'работа', 'отпуск', 'ёлка', 'рецепт',
+)
+
+
+def power_law(items, skew, rng):
+    """Выбор элементов с весом 1 / rank ** skew: немногие элементы
+    (популярные авторы, горячие посты) получают большую часть выборок."""
+    ranked = list(items)
+    rng.shuffle(ranked)
+    cum_weights = list(accumulate(
+        1 / rank ** skew for rank in range(1, len(ranked) + 1)
+    ))
+
+    def choose(count):
+        return rng.choices(ranked, cum_weights=cum_weights, k=count)
+    return choose
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими данными с реалистичным '
+            'перекосом: немногие авторы собирают большинство подписчиков, '
+            'немногие посты - большинство комментариев и лайков.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=30000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument('--likes', type=int, default=50000)
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='показатель степенного распределения популярности'
+        )
+        parser.add_argument(
+            '--days', type=float, default=30,
+            help='даты постов равномерно распределяются по этому числу '
+                 'последних дней'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='префикс имён пользователей и адресов сообществ'
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        skew = options['skew']
+        prefix = options['prefix']
+
+        users = self.create_users(options['users'], prefix)
+        groups = self.create_groups(options['groups'], prefix)
+        posts = self.create_posts(
+            options['posts'], power_law(users, skew, self.rng), groups,
+            timedelta(days=options['days'])
+        )
+        follows = self.create_follows(
+            options['follows'], users, power_law(users, skew, self.rng)
+        )
+        hot_posts = power_law(posts, skew, self.rng)
+        self.create_comments(options['comments'], users, hot_posts)
+        self.create_likes(options['likes'], users, hot_posts)
+        self.denormalize(users, posts, follows)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: пользователей {len(users)}, сообществ {len(groups)}, '
+            f'постов {len(posts)}, подписок {len(follows)}'
+        ))
+
+    def bulk_create(self, model, objects, **kwargs):
+        """Вставляет пачками и возвращает id новых строк: SQLite не
+        возвращает их из bulk_create."""
+        last = model.objects.order_by('-id').values_list(
+            'id', flat=True
+        ).first() or 0
+        model.objects.bulk_create(
+            objects, batch_size=self.batch_size, **kwargs
+        )
+        return list(model.objects.filter(id__gt=last).order_by(
+            'id'
+        ).values_list('id', flat=True))
+
+    def text(self, words):
+        return ' '.join(self.rng.choices(TEXT_WORDS, k=words)).capitalize()
+
+    def create_users(self, count, prefix):
+        start = User.objects.filter(username__startswith=prefix).count()
+        return self.bulk_create(User, (
+            User(username=f'{prefix}{start + i}', password='!')
+            for i in range(count)
+        ))
+
+    def create_groups(self, count, prefix):
+        start = Group.objects.filter(slug__startswith=prefix).count()
+        return self.bulk_create(Group, (
+            Group(
+                title=f'Сообщество {start + i}',
+                slug=f'{prefix}-{start + i}',
+                description=self.text(10)
+            )
+            for i in range(count)
+        ))
+
+    def create_posts(self, count, authors, groups, window):
+        """Даты постов разбросаны по window до текущего момента: у лент,
+        курсорной пагинации и фильтров по дате реалистичный разброс."""
+        now = timezone.now()
+        posts = []
+        for author_id in authors(count):
+            created = now - window * self.rng.random()
+            posts.append(Post(
+                author_id=author_id,
+                group_id=(self.rng.choice(groups)
+                          if groups and self.rng.random() < 0.7 else None),
+                text=self.text(self.rng.randint(5, 60)),
+                created=created,
+                updated=created
+            ))
+        with keep_timestamps(Post):
+            return self.bulk_create(Post, posts)
+
+    def create_follows(self, count, users, authors):
+        pairs = {
+            (user_id, author_id)
+            for user_id, author_id in zip(
+                self.rng.choices(users, k=count), authors(count)
+            )
+            if user_id != author_id
+        }
+        return self.bulk_create(
+            Follow,
+            (Follow(user_id=user_id, author_id=author_id)
+             for user_id, author_id in pairs),
+            ignore_conflicts=True
+        )
+
+    def create_comments(self, count, users, posts):
+        self.bulk_create(Comment, (
+            Comment(
+                author_id=author_id,
+                post_id=post_id,
+                text=self.text(self.rng.randint(3, 20))
+            )
+            for author_id, post_id in zip(
+                self.rng.choices(users, k=count), posts(count)
+            )
+        ))
+
+    def create_likes(self, count, users, posts):
+        pairs = set(zip(self.rng.choices(users, k=count), posts(count)))
+        self.bulk_create(
+            Like,
+            (Like(user_id=user_id, post_id=post_id)
+             for user_id, post_id in pairs),
+            ignore_conflicts=True
+        )
+
+    def denormalize(self, users, posts, follows):
+        """bulk_create не отправляет сигналы: счётчики, статистику
+        авторов, ленты подписок и поисковый индекс строим отдельно.
+        Подписки и посты созданы только между новыми пользователями,
+        поэтому статистика остальных не трогается."""
+        if posts:
+            Post.recount(Post.objects.filter(id__gte=posts[0]))
+        AuthorStats.recount(AuthorStats.objects.filter(user_id__in=users))
+        if follows:
+            new_follows = Follow.objects.filter(
+                id__gte=follows[0]
+            ).select_related('author')
+            for follow in new_follows.iterator():
+                timeline.backfill(follow)
+        search.rebuild()
+        cache.clear()
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = ('Обрезает ленты подписок до TIMELINE_LIMIT последних записей. '
+            'Запускается периодически (например, из cron).')
+
+    def handle(self, *args, **options):
+        trimmed = timeline.trim_all()
+        self.stdout.write(self.style.SUCCESS(f'Обрезано лент: {trimmed}'))
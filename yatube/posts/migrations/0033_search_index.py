@@ -0,0 +1,71 @@
+# Generated by Django 2.2.19 on 2026-10-18 12:09
+
+import re
+from collections import Counter
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+        "text, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        'INSERT INTO posts_post_fts (rowid, text) '
+        "SELECT id, REPLACE(REPLACE(text, 'Ё', 'е'), 'ё', 'е') FROM posts_post"
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+
+
+def fill_search_terms(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        return
+    Post = apps.get_model('posts', 'Post')
+    PostSearchTerm = apps.get_model('posts', 'PostSearchTerm')
+    for post in Post.objects.only('id', 'text').iterator():
+        words = re.findall(r'\w+', post.text.lower().replace('ё', 'е'))
+        PostSearchTerm.objects.bulk_create(
+            PostSearchTerm(post_id=post.id, term=term[:64], count=count)
+            for term, count in Counter(words).items()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0032_post_thumbnail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Терм')),
+                ('count', models.PositiveIntegerField(default=1, verbose_name='Число вхождений')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Поисковый терм',
+                'verbose_name_plural': 'Поисковые термы',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='postsearchterm',
+            index=models.Index(fields=['term', 'post'], name='search_term_post_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='postsearchterm',
+            constraint=models.UniqueConstraint(fields=('post', 'term'), name='post_term_unique'),
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+        migrations.RunPython(fill_search_terms, migrations.RunPython.noop),
+    ]
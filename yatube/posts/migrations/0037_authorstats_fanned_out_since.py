@@ -0,0 +1,18 @@
+# Generated by Django 2.2.19 on 2026-10-18 12:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0036_comment_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='fanned_out_since',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Раскладка по лентам с'),
+        ),
+    ]
@@ -1,7 +1,12 @@
+from collections import defaultdict
+
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
 from core.models import CreatedModel
+from core.routers import PRIMARY
 
 User = get_user_model()
 
@@ -25,7 +30,8 @@ class Post(CreatedModel):
         User,
         on_delete=models.CASCADE,
         related_name='posts',
-        verbose_name='Автор'
+        verbose_name='Автор',
+        db_index=False  # покрыт индексом post_author_created_idx
     )
     group = models.ForeignKey(
         Group,
@@ -34,7 +40,8 @@ class Post(CreatedModel):
         blank=True,
         null=True,
         verbose_name='Сообщество',
-        help_text='Сообщество, к которому будет относиться пост'
+        help_text='Сообщество, к которому будет относиться пост',
+        db_index=False  # покрыт индексом post_group_created_idx
     )
     image = models.ImageField(
         'Изображение',
@@ -42,10 +49,36 @@ class Post(CreatedModel):
         blank=True,
         help_text='Добавить изображение'
     )
+    # готовое уменьшенное изображение для лент (posts.thumbnails)
+    thumbnail = models.ImageField(
+        'Миниатюра',
+        upload_to='posts/thumbs/',
+        blank=True,
+        editable=False
+    )
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
+    # денормализованные счётчики: избавляют ленты от COUNT-запросов
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев', default=0, editable=False
+    )
+    like_count = models.PositiveIntegerField(
+        'Количество лайков', default=0, editable=False
+    )
 
     class Meta(CreatedModel.Meta):
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = (
+            # keyset-пагинация лент по (created, id):
+            models.Index(fields=('created', 'id'), name='post_created_id_idx'),
+            # ленты сообществ и авторов, фильтры API:
+            models.Index(
+                fields=('group', 'created'), name='post_group_created_idx'
+            ),
+            models.Index(
+                fields=('author', 'created'), name='post_author_created_idx'
+            ),
+        )
 
     def __str__(self):
         return (
@@ -55,6 +88,26 @@ class Post(CreatedModel):
             f'Пост: {self.text[:15]}.'
         )
 
+    @classmethod
+    def shift_counter(cls, post_id, field, delta):
+        """Атомарно изменяет счётчик comment_count или like_count."""
+        cls.objects.filter(id=post_id).update(**{field: F(field) + delta})
+
+    @classmethod
+    def recount(cls, queryset=None):
+        """Пересчитывает счётчики комментариев и лайков по таблицам."""
+        def count_of(model):
+            return Coalesce(Subquery(
+                model.objects.filter(post=OuterRef('pk'))
+                .order_by().values('post')
+                .annotate(total=Count('id')).values('total')
+            ), 0)
+        if queryset is None:
+            queryset = cls.objects.all()
+        return queryset.update(
+            comment_count=count_of(Comment), like_count=count_of(Like)
+        )
+
 
 class Comment(CreatedModel):
     text = models.TextField('Комментарий', help_text='Содержание комментария')
@@ -68,13 +121,21 @@ class Comment(CreatedModel):
         Post,
         on_delete=models.CASCADE,
         related_name='comments',
-        verbose_name='Пост'
+        verbose_name='Пост',
+        db_index=False  # покрыт индексом comment_post_created_idx
     )
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
 
     class Meta(CreatedModel.Meta):
         ordering = ('created',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = (
+            # комментарии поста по порядку (страница поста, API):
+            models.Index(
+                fields=('post', 'created'), name='comment_post_created_idx'
+            ),
+        )
 
     def __str__(self):
         return (
@@ -127,7 +188,8 @@ class Like(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='made_like',
-        verbose_name='Поставил лайк'
+        verbose_name='Поставил лайк',
+        db_index=False  # покрыт уникальным индексом (user, post)
     )
     post = models.ForeignKey(
         Post,
@@ -149,3 +211,161 @@ class Like(models.Model):
         return (
             f'{self.user.username} оценил пост: {self.post.text[:15]}.'
         )
+
+
+class AuthorStats(models.Model):
+    """Денормализованная статистика автора для страниц профиля."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+    # Когда автор снова стал раскладываться по лентам: его более ранние
+    # посты (опубликованные, пока подписчиков было слишком много) в
+    # ленты не попали и читаются запросом к таблице постов.
+    fanned_out_since = models.DateTimeField(
+        'Раскладка по лентам с', null=True, blank=True
+    )
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return (
+            f'{self.user.username}: постов {self.posts_count}, '
+            f'подписчиков {self.followers_count}, '
+            f'подписок {self.following_count}.'
+        )
+
+    @classmethod
+    def shift(cls, user_id, field, delta):
+        """Атомарно изменяет счётчик. Отсутствующая запись не создаётся:
+        она будет посчитана заново при первом чтении."""
+        cls.objects.filter(user_id=user_id).update(**{field: F(field) + delta})
+
+    @classmethod
+    def shift_many(cls, field, deltas):
+        """shift для словаря {user_id: delta}: запрос на каждое
+        различное значение delta."""
+        by_delta = defaultdict(list)
+        for user_id, delta in deltas.items():
+            by_delta[delta].append(user_id)
+        for delta, user_ids in by_delta.items():
+            cls.objects.filter(user_id__in=user_ids).update(
+                **{field: F(field) + delta}
+            )
+
+    @classmethod
+    def recount(cls, queryset=None):
+        """Пересчитывает счётчики на месте. Записи не удаляются: в них
+        хранится и fanned_out_since, который по таблицам не восстановить."""
+        def count_of(model, field):
+            return Coalesce(Subquery(
+                model.objects.filter(**{field: OuterRef('user')})
+                .order_by().values(field)
+                .annotate(total=Count('id')).values('total')
+            ), 0)
+        if queryset is None:
+            queryset = cls.objects.all()
+        return queryset.update(
+            posts_count=count_of(Post, 'author'),
+            followers_count=count_of(Follow, 'author'),
+            following_count=count_of(Follow, 'user'),
+        )
+
+    @classmethod
+    def for_author(cls, author):
+        """Возвращает статистику автора, при необходимости пересчитав её."""
+        try:
+            return cls.objects.get(user=author)
+        except cls.DoesNotExist:
+            return cls.rebuild(author)
+
+    @classmethod
+    def rebuild(cls, author):
+        # счётчики читаются из той БД, куда пишутся, а не с реплики.
+        # Роутер не спрашивается (и user_id вместо user: присваивание
+        # объекта тоже вызывает db_for_write): пересчёт - не запись
+        # клиента и не должен закреплять его чтения за основной БД
+        db = PRIMARY
+        posts, follows = Post.objects.using(db), Follow.objects.using(db)
+        stats, _ = cls.objects.using(db).update_or_create(
+            user_id=author.id, defaults={
+                'posts_count': posts.filter(author=author).count(),
+                'followers_count': follows.filter(author=author).count(),
+                'following_count': follows.filter(user=author).count(),
+            }
+        )
+        return stats
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок: запись на каждый пост автора,
+    на которого подписан пользователь (fan-out при публикации)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель',
+        db_index=False  # покрыт индексом timeline_user_created_idx
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    # копия post.created: лента сортируется без обращения к таблице постов
+    created = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='user_post_timeline_unique'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', 'created'), name='timeline_user_created_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'Лента {self.user.username}: пост {self.post_id}.'
+
+
+class PostSearchTerm(models.Model):
+    """Терм поискового индекса для СУБД без встроенного полнотекстового
+    поиска (на SQLite используется FTS5, см. posts.search)."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name='Пост',
+        db_index=False  # покрыт уникальным индексом (post, term)
+    )
+    term = models.CharField('Терм', max_length=64)
+    count = models.PositiveIntegerField('Число вхождений', default=1)
+
+    class Meta:
+        verbose_name = 'Поисковый терм'
+        verbose_name_plural = 'Поисковые термы'
+        constraints = (
+            models.UniqueConstraint(
+                fields=['post', 'term'], name='post_term_unique'
+            ),
+        )
+        indexes = (
+            models.Index(fields=('term', 'post'), name='search_term_post_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.term} ({self.count}): пост {self.post_id}.'
@@ -0,0 +1,106 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(post, reverse=False):
+    """Упаковывает позицию (created, id) в непрозрачный токен."""
+    raw = json.dumps(
+        {'c': post.created.isoformat(), 'i': post.id, 'r': int(reverse)}
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает (created, id, reverse) или None для негодного токена."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        data = json.loads(raw.decode())
+        created = parse_datetime(data['c'])
+        post_id = int(data['i'])
+        reverse = bool(data.get('r'))
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None
+    if created is None:
+        return None
+    return created, post_id, reverse
+
+
+class CursorPage:
+    """Страница ленты без OFFSET и COUNT(*): позиция задаётся курсором
+    по паре (created, id), навигация - только «вперёд/назад»."""
+    cursor_mode = True
+
+    def __init__(self, object_list, number, has_next, has_previous):
+        self.object_list = object_list
+        self.number = number
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __contains__(self, item):
+        return item in self.object_list
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not (self._has_next and self.object_list):
+            return ''
+        return encode_cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not (self._has_previous and self.object_list):
+            return ''
+        return encode_cursor(self.object_list[0], reverse=True)
+
+
+class CursorPaginator:
+    """Keyset-пагинация постов в порядке (-created, -id)."""
+
+    def __init__(self, posts, per_page):
+        self.posts = posts
+        self.per_page = per_page
+
+    def get_page(self, token):
+        position = decode_cursor(token) if token else None
+        if position is None:
+            rows = list(self.posts.order_by('-created', '-id')[
+                :self.per_page + 1
+            ])
+            return CursorPage(
+                rows[:self.per_page], 1, len(rows) > self.per_page, False
+            )
+        created, post_id, reverse = position
+        if reverse:
+            rows = list(self.posts.filter(
+                Q(created__gt=created) | Q(created=created, id__gt=post_id)
+            ).order_by('created', 'id')[:self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            return CursorPage(
+                rows[:self.per_page][::-1], token, True, has_previous
+            )
+        rows = list(self.posts.filter(
+            Q(created__lt=created) | Q(created=created, id__lt=post_id)
+        ).order_by('-created', '-id')[:self.per_page + 1])
+        return CursorPage(
+            rows[:self.per_page], token, len(rows) > self.per_page, True
+        )
@@ -0,0 +1,141 @@
+"""Полнотекстовый поиск по постам.
+
+На SQLite используется виртуальная таблица FTS5 с ранжированием bm25,
+на остальных СУБД - таблица термов PostSearchTerm. Индекс обновляется
+сигналами при создании, правке и удалении поста; после массовой загрузки
+его перестраивает команда rebuild_search_index.
+"""
+import re
+from collections import Counter
+
+from django.db import connection
+from django.db.models import IntegerField, OuterRef, Q, Subquery, Sum
+
+from posts.models import Post, PostSearchTerm
+
+FTS_TABLE = 'posts_post_fts'
+# Окончания, отбрасываемые у слов запроса: «кошки» найдёт «кошка».
+ENDINGS = sorted((
+    'ами', 'ями', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ать', 'ять',
+    'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ой', 'ей', 'ий', 'ый', 'ов', 'ев',
+    'ах', 'ях', 'ам', 'ям', 'ом', 'ем', 'ую', 'юю', 'ть',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь',
+), key=len, reverse=True)
+MIN_STEM = 3
+
+
+def uses_fts():
+    return connection.vendor == 'sqlite'
+
+
+def normalize(text):
+    # unicode61 в FTS5 не приравнивает «ё» к «е»
+    return text.lower().replace('ё', 'е')
+
+
+def tokenize(text):
+    return re.findall(r'\w+', normalize(text))
+
+
+def stem(word):
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def query_stems(query):
+    return list(dict.fromkeys(stem(word) for word in tokenize(query)))
+
+
+def search(queryset, query):
+    """Посты из queryset, подходящие под запрос, от лучших к худшим.
+
+    Совпадением считается слово, начинающееся с основы слова запроса;
+    чем больше совпадений, тем выше пост.
+    """
+    stems = query_stems(query)
+    if not stems:
+        return queryset.none()
+    if uses_fts():
+        match = ' OR '.join(f'"{word}"*' for word in stems)
+        # bm25() работает только в запросе, соединённом с самой FTS-таблицей
+        return queryset.extra(
+            select={'rank': f'bm25({FTS_TABLE})'},
+            tables=(FTS_TABLE,),
+            where=(
+                f'{FTS_TABLE}.rowid = {Post._meta.db_table}.id',
+                f'{FTS_TABLE} MATCH %s',
+            ),
+            params=(match,)
+        ).order_by('rank', '-created', '-id')
+    condition = Q()
+    for word in stems:
+        condition |= Q(term__startswith=word)
+    score = PostSearchTerm.objects.filter(
+        condition, post=OuterRef('pk')
+    ).order_by().values('post').annotate(total=Sum('count')).values('total')
+    return queryset.annotate(
+        rank=Subquery(score, output_field=IntegerField())
+    ).filter(rank__gt=0).order_by('-rank', '-created', '-id')
+
+
+def index_post(post):
+    remove_post(post.id)
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                (post.id, normalize(post.text))
+            )
+        return
+    PostSearchTerm.objects.bulk_create(
+        PostSearchTerm(post_id=post.id, term=term[:64], count=count)
+        for term, count in Counter(tokenize(post.text)).items()
+    )
+
+
+def index_new_posts(posts):
+    """Индексирует пакет только что вставленных постов."""
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [(post.id, normalize(post.text)) for post in posts]
+            )
+        return
+    PostSearchTerm.objects.bulk_create(
+        (PostSearchTerm(post_id=post.id, term=term[:64], count=count)
+         for post in posts
+         for term, count in Counter(tokenize(post.text)).items()),
+        batch_size=500
+    )
+
+
+def remove_post(post_id):
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', (post_id,)
+            )
+        return
+    PostSearchTerm.objects.filter(post_id=post_id).delete()
+
+
+def rebuild():
+    """Перестраивает индекс по всем постам."""
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                f"SELECT id, REPLACE(REPLACE(text, 'Ё', 'е'), 'ё', 'е') "
+                f'FROM {Post._meta.db_table}'
+            )
+        return Post.objects.count()
+    PostSearchTerm.objects.all().delete()
+    total = 0
+    for post in Post.objects.only('id', 'text').iterator(chunk_size=500):
+        index_post(post)
+        total += 1
+    return total
@@ -1 +1,25 @@
 PAGINATOR_PAGE = 10
+# Keyset-пагинация лент по курсору вместо номеров страниц. Включается
+# для всех лент здесь или для отдельного запроса параметром ?cursor=
+PAGINATOR_CURSOR = False
+# Лента подписок: сколько записей хранится на читателя и начиная с какого
+# числа подписчиков посты автора не раскладываются по лентам, а
+# подмешиваются при чтении.
+TIMELINE_LIMIT = 1000
+TIMELINE_FANOUT_MAX_FOLLOWERS = 5000
+# Время жизни (в секундах) закэшированной страницы списка авторов.
+AUTHORS_CACHE_TIMEOUT = 60
+# Время жизни (в секундах) закэшированных фрагментов лент; при изменении
+# постов, комментариев, лайков и сообществ фрагменты сбрасываются раньше.
+PAGE_CACHE_TIMEOUT = 60 * 5
+# Время жизни (в секундах) закэшированной карточки поста. Правка поста
+# меняет ключ карточки (поле updated); счётчики, имя автора и название
+# сообщества тоже входят в ключ.
+CARD_CACHE_TIMEOUT = 60 * 60
+# Миниатюры изображений постов готовятся при сохранении поста в фоновом
+# пуле потоков (False - сразу, в потоке запроса).
+THUMBNAIL_SIZE = (700, 700)
+THUMBNAIL_ASYNC = True
+THUMBNAIL_WORKERS = 2
+# Сколько комментариев показывается на странице поста за раз.
+COMMENTS_PAGE = 20
@@ -0,0 +1,201 @@
+from collections import Counter, defaultdict
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from posts import caching, search, thumbnails, timeline
+from posts.bulk import bulk_created
+from posts.models import (
+    AuthorStats, Comment, Follow, Group, Like, Post, User
+)
+
+# Поля пользователя, которые показываются в карточках постов.
+USER_NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+# Модель -> поле-счётчик поста, которое она поддерживает.
+COUNTERS = {
+    Comment: 'comment_count',
+    Like: 'like_count',
+}
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Like)
+def increment_post_counter(sender, instance, created, **kwargs):
+    if created:
+        Post.shift_counter(instance.post_id, COUNTERS[sender], 1)
+
+
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Like)
+def decrement_post_counter(sender, instance, **kwargs):
+    Post.shift_counter(instance.post_id, COUNTERS[sender], -1)
+
+
+@receiver(post_save, sender=Post)
+def increment_author_posts(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.shift(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def decrement_author_posts(sender, instance, **kwargs):
+    AuthorStats.shift(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def increment_follow_stats(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.shift(instance.author_id, 'followers_count', 1)
+        AuthorStats.shift(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def decrement_follow_stats(sender, instance, **kwargs):
+    AuthorStats.shift(instance.author_id, 'followers_count', -1)
+    AuthorStats.shift(instance.user_id, 'following_count', -1)
+    timeline.resume_fan_out(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    timeline.prune(instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_state(sender, instance, **kwargs):
+    old = instance.pk and Post.objects.filter(
+        pk=instance.pk
+    ).values('group_id', 'image').first()
+    instance._old_group_id = old and old['group_id']
+    instance._old_image = old and old['image']
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_fragments(sender, instance, **kwargs):
+    scopes = {'index', f'profile:{instance.author_id}'}
+    old_group_id = getattr(instance, '_old_group_id', None)
+    for group_id in (instance.group_id, old_group_id):
+        if group_id:
+            scopes.add(f'group:{group_id}')
+    caching.invalidate(*scopes)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def invalidate_counter_fragments(sender, instance, **kwargs):
+    caching.invalidate('index')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_fragments(sender, instance, **kwargs):
+    caching.invalidate('index', 'groups', f'group:{instance.id}')
+
+
+@receiver(pre_save, sender=User)
+def remember_user_name(sender, instance, update_fields=None, **kwargs):
+    # вход сохраняет только last_login: лишний запрос не нужен
+    if update_fields is not None and not set(update_fields) & set(
+        USER_NAME_FIELDS
+    ):
+        instance._old_name = None
+        return
+    instance._old_name = instance.pk and User.objects.filter(
+        pk=instance.pk
+    ).values_list(*USER_NAME_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_fragments(sender, instance, created, **kwargs):
+    old_name = getattr(instance, '_old_name', None)
+    name = tuple(getattr(instance, field) for field in USER_NAME_FIELDS)
+    if created or not old_name or old_name == name:
+        return
+    scopes = {'index', f'profile:{instance.id}'}
+    scopes.update(
+        f'group:{group_id}' for group_id in Post.objects.filter(
+            author=instance, group__isnull=False
+        ).order_by().values_list('group_id', flat=True).distinct()
+    )
+    caching.invalidate(*scopes)
+
+
+@receiver(post_save, sender=Post)
+def schedule_thumbnail(sender, instance, **kwargs):
+    old_image = getattr(instance, '_old_image', None)
+    if (instance.image.name or None) == (old_image or None):
+        return
+    thumbnails.discard(instance)
+    if instance.image:
+        thumbnails.schedule(instance)
+
+
+@receiver(post_save, sender=Post)
+def index_post_text(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'text' in update_fields:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_post_text(sender, instance, **kwargs):
+    search.remove_post(instance.id)
+
+
+@receiver(bulk_created, sender=Post)
+def posts_bulk_created(sender, instances, **kwargs):
+    by_author = defaultdict(list)
+    for post in instances:
+        by_author[post.author_id].append(post)
+    scopes = {'index'}
+    for author_id, posts in by_author.items():
+        AuthorStats.shift(author_id, 'posts_count', len(posts))
+        timeline.fan_out_many(posts[0].author, posts)
+        scopes.add(f'profile:{author_id}')
+    search.index_new_posts(instances)
+    for post in instances:
+        if post.image:
+            thumbnails.schedule(post)
+        if post.group_id:
+            scopes.add(f'group:{post.group_id}')
+    caching.invalidate(*scopes)
+
+
+@receiver(bulk_created, sender=Comment)
+@receiver(bulk_created, sender=Like)
+def counters_bulk_created(sender, instances, **kwargs):
+    counts = Counter(instance.post_id for instance in instances)
+    for post_id, count in counts.items():
+        Post.shift_counter(post_id, COUNTERS[sender], count)
+    caching.invalidate('index')
+
+
+@receiver(bulk_created, sender=Group)
+def groups_bulk_created(sender, instances, **kwargs):
+    caching.invalidate('index', 'groups')
+
+
+@receiver(bulk_created, sender=Follow)
+def follows_bulk_created(sender, instances, **kwargs):
+    AuthorStats.shift_many('followers_count', Counter(
+        follow.author_id for follow in instances
+    ))
+    AuthorStats.shift_many('following_count', Counter(
+        follow.user_id for follow in instances
+    ))
+    timeline.backfill_many(instances)
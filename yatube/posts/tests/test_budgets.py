@@ -0,0 +1,122 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import Budget, BudgetTestMixin
+from posts.models import Comment, Follow, Group, Like, Post, User
+from posts.settings import PAGINATOR_PAGE
+from posts.urls import urlpatterns
+
+AUTHOR = 'Author'
+READER = 'Reader'
+SLUG = 'test-slug'
+TEXT = 'Тестовый текст'
+# Страниц больше одной и у каждого поста есть комментарии и лайки:
+# запросы «на каждый пост» сразу выходят за бюджет.
+POSTS = PAGINATOR_PAGE * 3
+COMMENTS_PER_POST = 3
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+# Бюджеты страниц posts.urls для авторизованного читателя при пустом кэше.
+# Два запроса из каждого бюджета - сессия и пользователь.
+BUDGETS = {
+    'index': Budget(queries=4),
+    'group_list': Budget(queries=5),
+    'profile': Budget(queries=7),
+    'post_detail': Budget(queries=4),
+    'post_comments': Budget(queries=4),
+    'post_create': Budget(queries=10),
+    'post_edit': Budget(queries=8),
+    'add_comment': Budget(queries=5),
+    'follow_index': Budget(queries=5),
+    'profile_follow': Budget(queries=19),
+    'profile_unfollow': Budget(queries=8),
+    'groups_index': Budget(queries=3),
+    'search': Budget(queries=4),
+    'authors_index': Budget(queries=4),
+    'add_like': Budget(queries=4),
+    'delete_like': Budget(queries=5),
+}
+
+
+def tearDownModule():
+    shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PageBudgetTests(BudgetTestMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR)
+        cls.reader = User.objects.create_user(username=READER)
+        cls.group = Group.objects.create(title=SLUG, slug=SLUG)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for _ in range(POSTS):
+            post = Post.objects.create(
+                author=cls.author, group=cls.group, text=TEXT
+            )
+            for _ in range(COMMENTS_PER_POST):
+                Comment.objects.create(author=cls.reader, post=post, text=TEXT)
+        Like.objects.create(user=cls.reader, post=post)
+        cls.post = post
+        cls.client_reader = Client()
+        cls.client_reader.force_login(cls.reader)
+        cls.client_author = Client()
+        cls.client_author.force_login(cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def requests(self):
+        """Название URL -> запрос, который проверяется бюджетом."""
+        post_id = self.post.id
+        reader, author = self.client_reader, self.client_author
+        return {
+            'index': lambda: reader.get(reverse('posts:index')),
+            'group_list': lambda: reader.get(
+                reverse('posts:group_list', args=[SLUG])),
+            'profile': lambda: reader.get(
+                reverse('posts:profile', args=[AUTHOR])),
+            'post_detail': lambda: reader.get(
+                reverse('posts:post_detail', args=[post_id])),
+            'post_comments': lambda: reader.get(
+                reverse('posts:post_comments', args=[post_id])),
+            'post_create': lambda: author.post(
+                reverse('posts:post_create'), {'text': TEXT}),
+            'post_edit': lambda: author.post(
+                reverse('posts:post_edit', args=[post_id]), {'text': TEXT}),
+            'add_comment': lambda: reader.post(
+                reverse('posts:add_comment', args=[post_id]), {'text': TEXT}),
+            'follow_index': lambda: reader.get(reverse('posts:follow_index')),
+            'profile_follow': lambda: author.get(
+                reverse('posts:profile_follow', args=[READER])),
+            'profile_unfollow': lambda: reader.get(
+                reverse('posts:profile_unfollow', args=[AUTHOR])),
+            'groups_index': lambda: reader.get(reverse('posts:groups_index')),
+            'search': lambda: reader.get(
+                reverse('posts:search'), {'q': 'текст'}),
+            'authors_index': lambda: reader.get(
+                reverse('posts:authors_index')),
+            'add_like': lambda: author.get(
+                reverse('posts:add_like', args=[post_id])),
+            'delete_like': lambda: reader.get(
+                reverse('posts:delete_like', args=[post_id])),
+        }
+
+    def test_every_page_has_budget(self):
+        """Для каждого URL приложения posts задан бюджет."""
+        names = {pattern.name for pattern in urlpatterns}
+        self.assertEqual(names, set(BUDGETS))
+        self.assertEqual(names, set(self.requests()))
+
+    def test_pages_within_budget(self):
+        """Страницы укладываются в бюджет запросов и времени."""
+        for name, request in self.requests().items():
+            with self.subTest(url=name):
+                self.assertWithinBudget(BUDGETS[name], request)
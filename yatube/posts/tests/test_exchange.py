@@ -0,0 +1,172 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts.models import (
+    Comment, Follow, Group, Like, Post, TimelineEntry, User
+)
+
+AUTHOR = 'Author'
+READER = 'Reader'
+SLUG = 'test-slug'
+TEXT = 'Тестовый текст,\nв две строки'
+IMAGE = 'posts/small.gif'
+CREATED = datetime(2021, 5, 1, 12, 30, tzinfo=timezone.utc)
+# порядок загрузки: связи ссылаются на уже загруженные объекты
+MODELS = ('group', 'post', 'comment', 'follow', 'like')
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_MEDIA_ROOT = os.path.join(TEMP_DIR, 'media')
+
+
+def tearDownModule():
+    shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ExchangeTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username=AUTHOR)
+        self.reader = User.objects.create_user(username=READER)
+        group = Group.objects.create(title='Группа', slug=SLUG)
+        self.post = Post.objects.create(
+            author=self.author, group=group, text=TEXT, image=IMAGE
+        )
+        Post.objects.filter(id=self.post.id).update(created=CREATED)
+        Comment.objects.create(author=self.reader, post=self.post, text=TEXT)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Like.objects.create(user=self.reader, post=self.post)
+
+    def path(self, name):
+        return os.path.join(TEMP_DIR, name)
+
+    def export(self, model, file_format='ndjson'):
+        path = self.path(f'{model}.{file_format}')
+        call_command(
+            'export_data', model, format=file_format, output=path,
+            chunk_size=1, stderr=StringIO()
+        )
+        return path
+
+    def load(self, model, path, **options):
+        stdout = StringIO()
+        call_command(
+            'import_data', model, path,
+            stdout=stdout, stderr=StringIO(), **options
+        )
+        return stdout.getvalue()
+
+    def clear(self):
+        for model in (Group, Post, User):
+            model.objects.all().delete()
+
+    def check_round_trip(self, file_format):
+        paths = [self.export(model, file_format) for model in MODELS]
+        self.clear()
+        for model, path in zip(MODELS, paths):
+            self.load(model, path)
+        post = Post.objects.select_related('author', 'group').get()
+        self.assertEqual(post.id, self.post.id)
+        self.assertEqual(post.text, TEXT)
+        self.assertEqual(post.created, CREATED)
+        self.assertEqual(post.author.username, AUTHOR)
+        self.assertEqual(post.group.slug, SLUG)
+        self.assertEqual(post.image.name, IMAGE)
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(post.like_count, 1)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user__username=READER, post=post
+        ).exists())
+        for model, path in zip(MODELS, paths):
+            self.load(model, path)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_round_trip_ndjson(self):
+        """Выгрузка и загрузка NDJSON сохраняют данные и связи."""
+        self.check_round_trip('ndjson')
+
+    def test_round_trip_csv(self):
+        """Выгрузка и загрузка CSV сохраняют данные и связи."""
+        self.check_round_trip('csv')
+
+    def test_export_is_one_row_per_line(self):
+        with open(self.export('post')) as stream:
+            rows = [json.loads(line) for line in stream]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['author'], AUTHOR)
+
+    def test_resume_skips_processed_rows(self):
+        """С --resume загрузка продолжается с сохранённой строки."""
+        Post.objects.create(author=self.author, text='Второй пост')
+        path = self.export('post')
+        Post.objects.all().delete()
+        with open(f'{path}.state', 'w') as state_file:
+            json.dump({'model': 'post', 'done': 1}, state_file)
+        self.load('post', path, resume=True, batch_size=1)
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)), ['Второй пост']
+        )
+        self.assertFalse(os.path.exists(f'{path}.state'))
+
+    def test_images_copied_into_media_root(self):
+        media_from = self.path('images')
+        os.makedirs(media_from)
+        with open(os.path.join(media_from, 'small.gif'), 'wb') as image:
+            image.write(b'GIF89a')
+        path = self.export('post')
+        Post.objects.all().delete()
+        self.load('post', path, media_from=media_from)
+        self.assertEqual(Post.objects.get().image.name, IMAGE)
+        self.assertTrue(
+            os.path.exists(os.path.join(TEMP_MEDIA_ROOT, IMAGE))
+        )
+
+    def test_csv_keeps_empty_text(self):
+        """Пустая ячейка NOT NULL колонки в CSV - пустая строка, а не
+        null; в допускающей null колонке - null."""
+        Group.objects.update(description='')
+        Post.objects.update(group=None)
+        paths = [self.export(model, 'csv') for model in ('group', 'post')]
+        self.clear()
+        for model, path in zip(('group', 'post'), paths):
+            self.load(model, path)
+        self.assertEqual(Group.objects.get().description, '')
+        self.assertIsNone(Post.objects.get().group)
+
+    def test_id_taken_by_other_object_is_reported(self):
+        path = self.export('post')
+        Post.objects.all().delete()
+        Post.objects.create(id=self.post.id, author=self.reader, text='Чужой')
+        output = self.load('post', path)
+        self.assertIn(str(self.post.id), output)
+        self.assertEqual(Post.objects.get().text, 'Чужой')
+
+    def test_image_with_taken_name_is_not_replaced(self):
+        """Другое изображение с тем же именем копируется под новым."""
+        media_from = self.path('other-images')
+        os.makedirs(media_from)
+        self.addCleanup(shutil.rmtree, media_from)
+        self.addCleanup(shutil.rmtree, TEMP_MEDIA_ROOT, ignore_errors=True)
+        with open(os.path.join(media_from, 'small.gif'), 'wb') as image:
+            image.write(b'GIF89a')
+        existing = os.path.join(TEMP_MEDIA_ROOT, IMAGE)
+        os.makedirs(os.path.dirname(existing), exist_ok=True)
+        with open(existing, 'wb') as image:
+            image.write(b'GIF87a')
+        path = self.export('post')
+        Post.objects.all().delete()
+        self.load('post', path, media_from=media_from)
+        name = Post.objects.get().image.name
+        self.assertNotEqual(name, IMAGE)
+        with open(existing, 'rb') as image:
+            self.assertEqual(image.read(), b'GIF87a')
+        with open(os.path.join(TEMP_MEDIA_ROOT, name), 'rb') as image:
+            self.assertEqual(image.read(), b'GIF89a')
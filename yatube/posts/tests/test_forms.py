@@ -1,5 +1,6 @@
 import shutil
 import tempfile
+from unittest import mock
 
 from django import forms
 from django.conf import settings
@@ -98,6 +99,55 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(new_post.text, form_data['text'])
         self.assertRedirects(response, PROFILE_URL)
 
+    @mock.patch('posts.settings.THUMBNAIL_ASYNC', False)
+    def test_valid_form_creates_thumbnail(self):
+        """Миниатюра изображения готовится при сохранении поста."""
+        uploaded = SimpleUploadedFile(
+            name='small_3.gif',
+            content=SMALL_GIF,
+            content_type='image/gif'
+        )
+        self.author.post(POST_CREATE_URL, data={
+            'text': NEW_POST_TEXT,
+            'image': uploaded
+        })
+        thumbnail = Post.objects.get(image='posts/small_3.gif').thumbnail
+        self.assertEqual(thumbnail, 'posts/thumbs/small_3_700x700.jpg')
+        self.assertTrue(thumbnail.storage.exists(thumbnail.name))
+
+    def test_image_change_discards_thumbnail(self):
+        """Смена или удаление изображения удаляет прежнюю миниатюру."""
+        with mock.patch('posts.settings.THUMBNAIL_ASYNC', False):
+            self.author.post(POST_CREATE_URL, data={
+                'text': NEW_POST_TEXT,
+                'image': SimpleUploadedFile(
+                    name='small_4.gif', content=SMALL_GIF,
+                    content_type='image/gif'
+                )
+            })
+        post = Post.objects.get(image='posts/small_4.gif')
+        old_thumbnail = post.thumbnail.name
+        edit_url = reverse('posts:post_edit', args=[post.id])
+        # новая миниатюра строится в фоне: до неё карточка берёт оригинал
+        self.author.post(edit_url, data={
+            'text': NEW_POST_TEXT,
+            'image': SimpleUploadedFile(
+                name='small_5.gif', content=SMALL_GIF,
+                content_type='image/gif'
+            )
+        })
+        post.refresh_from_db()
+        self.assertEqual(post.image, 'posts/small_5.gif')
+        self.assertFalse(post.thumbnail)
+        self.assertFalse(post.thumbnail.storage.exists(old_thumbnail))
+        with mock.patch('posts.settings.THUMBNAIL_ASYNC', False):
+            self.author.post(edit_url, data={
+                'text': NEW_POST_TEXT, 'image-clear': 'on'
+            })
+        post.refresh_from_db()
+        self.assertFalse(post.image)
+        self.assertFalse(post.thumbnail)
+
     def test_unauthorized_user_unable_create_post(self):
         """Аноним не может создать новый пост."""
         existing_post_ids = set(
@@ -1,6 +1,12 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 
-from posts.models import Comment, Follow, Group, Post, User
+from posts.models import (
+    AuthorStats, Comment, Follow, Group, Like, Post, TimelineEntry, User
+)
 
 COMMENT = 'Тестовый комментарий'
 TITLE = 'Тестовая группа'
@@ -75,3 +81,104 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     Post._meta.get_field(field).verbose_name, expected)
+
+
+class PostCountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=NONAME)
+        cls.author = User.objects.create_user(username=AUTHOR)
+        cls.post = Post.objects.create(author=cls.author, text=TEXT)
+
+    def test_counters_follow_comments_and_likes(self):
+        """Счётчики поста меняются при создании и удалении
+        комментариев и лайков."""
+        comment = Comment.objects.create(
+            author=self.user, post=self.post, text=COMMENT
+        )
+        like = Like.objects.create(user=self.user, post=self.post)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(self.post.like_count, 1)
+        comment.delete()
+        like.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+        self.assertEqual(self.post.like_count, 0)
+
+    def test_recount_command_rebuilds_counters(self):
+        """Команда recount_posts восстанавливает рассогласованные счётчики."""
+        Comment.objects.create(author=self.user, post=self.post, text=COMMENT)
+        Post.objects.update(comment_count=5, like_count=3)
+        call_command('recount_posts', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(self.post.like_count, 0)
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=NONAME)
+        cls.author = User.objects.create_user(username=AUTHOR)
+        Post.objects.create(author=cls.author, text=TEXT)
+
+    def test_stats_built_on_first_read(self):
+        """Статистика автора считается при первом обращении."""
+        Follow.objects.create(author=self.author, user=self.user)
+        stats = AuthorStats.for_author(self.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(stats.following_count, 0)
+
+    def test_stats_follow_posts_and_subscriptions(self):
+        """Статистика меняется при создании и удалении постов и подписок."""
+        AuthorStats.for_author(self.author)
+        AuthorStats.for_author(self.user)
+        post = Post.objects.create(author=self.author, text=TEXT)
+        follow = Follow.objects.create(author=self.author, user=self.user)
+        author_stats = AuthorStats.for_author(self.author)
+        self.assertEqual(author_stats.posts_count, 2)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(AuthorStats.for_author(self.user).following_count, 1)
+        post.delete()
+        follow.delete()
+        author_stats.refresh_from_db()
+        self.assertEqual(author_stats.posts_count, 1)
+        self.assertEqual(author_stats.followers_count, 0)
+        self.assertEqual(AuthorStats.for_author(self.user).following_count, 0)
+
+
+class SeedDataTest(TestCase):
+    def test_seed_data_keeps_denormalized_data_consistent(self):
+        """seed_data создаёт данные и заполняет счётчики и ленты."""
+        call_command(
+            'seed_data', users=20, groups=2, posts=50, comments=100,
+            follows=40, likes=80, stdout=StringIO()
+        )
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Post.objects.count(), 50)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(TimelineEntry.objects.exists())
+        counters = list(Post.objects.values_list(
+            'id', 'comment_count', 'like_count'
+        ).order_by('id'))
+        Post.recount()
+        self.assertEqual(counters, list(Post.objects.values_list(
+            'id', 'comment_count', 'like_count'
+        ).order_by('id')))
+        top = max(Post.objects.values_list('comment_count', flat=True))
+        self.assertGreater(top, 100 / 50)
+
+    def test_seed_data_spreads_post_dates(self):
+        call_command(
+            'seed_data', users=5, groups=0, posts=50, comments=0,
+            follows=0, likes=0, days=10, stdout=StringIO()
+        )
+        dates = Post.objects.values_list('created', flat=True)
+        self.assertGreater(len(set(dates)), 40)
+        self.assertGreater(max(dates) - min(dates), timedelta(days=5))
+        self.assertLessEqual(max(dates) - min(dates), timedelta(days=10))
@@ -0,0 +1,114 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.db.models import Exists, OuterRef
+from django.test import TestCase
+
+from core.explain import query_plan
+from posts import timeline
+from posts.models import (
+    Comment, Follow, Group, Like, Post, TimelineEntry, User
+)
+from posts.settings import PAGINATOR_PAGE
+
+# Таблицы, растущие вместе с сайтом: полный просмотр недопустим.
+LARGE_TABLES = (
+    'posts_post', 'posts_comment', 'posts_follow', 'posts_like',
+    'posts_timelineentry'
+)
+USERS = 30
+POSTS = 3000
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN SQLite')
+class HotQueryPlanTests(TestCase):
+    """Частые запросы posts.views и api.views идут по индексам: без полного
+    просмотра больших таблиц и без сортировки во временном B-дереве."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.users = [
+            User.objects.create_user(username=f'user{i}')
+            for i in range(USERS)
+        ]
+        cls.groups = [
+            Group.objects.create(title=str(i), slug=f'group-{i}')
+            for i in range(USERS)
+        ]
+        Post.objects.bulk_create(
+            Post(
+                author=cls.users[i % USERS],
+                group=cls.groups[i % USERS] if i % 3 else None,
+                text='Текст'
+            )
+            for i in range(POSTS)
+        )
+        posts = list(Post.objects.values_list('id', flat=True)[:100])
+        Comment.objects.bulk_create(
+            Comment(post_id=posts[i % 100], author=cls.users[i % USERS],
+                    text='Комментарий')
+            for i in range(POSTS)
+        )
+        Like.objects.bulk_create(
+            Like(post_id=post_id, user=user)
+            for post_id in posts for user in cls.users[:10]
+        )
+        for user in cls.users[1:]:
+            Follow.objects.create(user=user, author=cls.users[0])
+            Follow.objects.create(user=cls.users[0], author=user)
+        cls.post = Post.objects.get(id=posts[0])
+        cls.reader = cls.users[1]
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def hot_queries(self):
+        """[название, queryset, индекс, допустима ли сортировка]."""
+        page = slice(0, PAGINATOR_PAGE + 1)
+        author, group, post = self.users[0], self.groups[1], self.post
+        return [
+            ['index', Post.objects.select_related('author', 'group')[page],
+             'post_created_id_idx', False],
+            ['index_cursor', Post.objects.order_by('-created', '-id')[page],
+             'post_created_id_idx', False],
+            ['group_posts', group.posts.all()[page],
+             'post_group_created_idx', False],
+            ['profile', author.posts.all()[page],
+             'post_author_created_idx', False],
+            ['post_comments', post.comments.select_related('author'),
+             'comment_post_created_idx', False],
+            ['api_comments', post.comments.order_by('created', 'id')[page],
+             'comment_post_created_idx', False],
+            ['has_like', Like.objects.filter(post=post, user=author),
+             'sqlite_autoindex_posts_like', False],
+            ['following',
+             Follow.objects.filter(author=author, user=self.reader),
+             'sqlite_autoindex_posts_follow', False],
+            ['api_follow', self.reader.follower.order_by('-id')[page],
+             'posts_follow_user_id', False],
+            ['fan_out', Follow.objects.filter(author=author).values('user'),
+             'posts_follow_author_id', False],
+            ['timeline_trim', TimelineEntry.objects.filter(
+                user=self.reader).order_by('-created')[1000:1001],
+             'timeline_user_created_idx', False],
+            ['authors_index', User.objects.annotate(has_posts=Exists(
+                Post.objects.filter(author=OuterRef('pk')))
+            ).filter(has_posts=True).order_by('username')[page],
+             'post_author_created_idx', False],
+            ['follow_index', timeline.feed_for(self.reader)[page],
+             'timeline_user_created_idx', False],
+        ]
+
+    def test_hot_queries_use_indexes(self):
+        for name, queryset, index, sort_allowed in self.hot_queries():
+            with self.subTest(query=name):
+                plan = query_plan(queryset)
+                self.assertIn(index, plan)
+                for step in plan.split(' | '):
+                    table = step.split()[1] if step.startswith('SCAN') else ''
+                    self.assertFalse(
+                        table in LARGE_TABLES and 'USING' not in step,
+                        f'Полный просмотр таблицы: {plan}'
+                    )
+                if not sort_allowed:
+                    self.assertNotIn('USE TEMP B-TREE', plan)
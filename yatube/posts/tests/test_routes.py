@@ -15,6 +15,7 @@ class RoutesURLTest(TestCase):
             ['profile', [AUTHOR], f'/profile/{AUTHOR}/'],
             ['post_create', [], '/create/'],
             ['post_detail', [POST_ID], f'/posts/{POST_ID}/'],
+            ['post_comments', [POST_ID], f'/posts/{POST_ID}/comments/'],
             ['post_edit', [POST_ID], f'/posts/{POST_ID}/edit/'],
             ['add_comment', [POST_ID], f'/posts/{POST_ID}/comment/'],
             ['follow_index', [], '/follow/'],
@@ -0,0 +1,67 @@
+from unittest import mock
+
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post, User
+
+AUTHOR = 'Author'
+SEARCH_URL = reverse('posts:search')
+POST_LIST_URL = reverse('post-list')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR)
+        cls.guest = Client()
+
+    def create_posts(self):
+        self.cat = Post.objects.create(
+            author=self.author, text='Рыжая кошка спит на крыше'
+        )
+        self.cats = Post.objects.create(
+            author=self.author, text='Кошки, кошки и ещё раз КОШКИ'
+        )
+        self.hedgehog = Post.objects.create(
+            author=self.author, text='Ёжик в тумане'
+        )
+
+    def found(self, query):
+        return list(search.search(Post.objects.all(), query))
+
+    def check_search(self):
+        self.create_posts()
+        self.assertEqual(self.found('кошками'), [self.cats, self.cat])
+        self.assertEqual(self.found('ежик'), [self.hedgehog])
+        self.assertEqual(self.found('собака'), [])
+        self.cat.text = 'Собака'
+        self.cat.save()
+        self.assertEqual(self.found('кошки'), [self.cats])
+        self.assertEqual(self.found('собаки'), [self.cat])
+        self.cats.delete()
+        self.assertEqual(self.found('кошки'), [])
+
+    def test_search_fts(self):
+        """Поиск через FTS5 учитывает словоформы, правку и удаление."""
+        self.check_search()
+
+    def test_search_term_table(self):
+        """Поиск по таблице термов даёт те же результаты."""
+        with mock.patch('posts.search.uses_fts', return_value=False):
+            self.check_search()
+
+    def test_search_page_and_api(self):
+        """Поиск доступен на странице поиска и в API."""
+        self.create_posts()
+        page_obj = self.guest.get(SEARCH_URL, {'q': 'кошка'}).context[
+            'page_obj'
+        ]
+        self.assertEqual(list(page_obj), [self.cats, self.cat])
+        response = self.guest.get(POST_LIST_URL, {'search': 'туман'})
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(
+            response.data['results'][0]['id'], self.hedgehog.id
+        )
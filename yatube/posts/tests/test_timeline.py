@@ -0,0 +1,118 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts import timeline
+from posts.models import AuthorStats, Follow, Post, TimelineEntry, User
+
+AUTHOR = 'Author'
+OTHER_FOLLOWER = 'Другой подписчик'
+FOLLOWER = 'Подписчик'
+TEXT = 'Тестовый текст'
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR)
+        cls.follower = User.objects.create_user(username=FOLLOWER)
+        cls.old_post = Post.objects.create(author=cls.author, text=TEXT)
+
+    def feed_ids(self):
+        return set(
+            timeline.feed_for(self.follower).values_list('id', flat=True)
+        )
+
+    def test_follow_backfills_and_post_fans_out(self):
+        """Подписка заполняет ленту, новый пост попадает в ленту."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(author=self.author, text=TEXT)
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(
+                user=self.follower
+            ).values_list('post_id', flat=True)),
+            {self.old_post.id, post.id}
+        )
+        self.assertEqual(self.feed_ids(), {self.old_post.id, post.id})
+
+    def test_unfollow_prunes_timeline(self):
+        """Отписка убирает посты автора из ленты."""
+        follow = Follow.objects.create(user=self.follower, author=self.author)
+        follow.delete()
+        self.assertFalse(TimelineEntry.objects.filter(user=self.follower))
+        self.assertEqual(self.feed_ids(), set())
+
+    @mock.patch('posts.settings.TIMELINE_FANOUT_MAX_FOLLOWERS', 0)
+    def test_popular_author_is_read_on_demand(self):
+        """Посты популярного автора не раскладываются, но видны в ленте."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(author=self.author, text=TEXT)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.follower))
+        self.assertEqual(self.feed_ids(), {self.old_post.id, post.id})
+
+    @mock.patch('posts.settings.TIMELINE_LIMIT', 2)
+    def test_timeline_is_trimmed_to_limit(self):
+        """В ленте хранится не больше TIMELINE_LIMIT записей."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=TEXT)
+            for _ in range(3)
+        ]
+        call_command('trim_timelines', stdout=StringIO())
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(
+                user=self.follower
+            ).values_list('post_id', flat=True)),
+            {post.id for post in posts[1:]}
+        )
+
+    @mock.patch('posts.settings.TIMELINE_LIMIT', 2)
+    def test_timeline_is_trimmed_on_fan_out(self):
+        """Раскладка нового поста сразу обрезает переполненные ленты."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=TEXT)
+            for _ in range(3)
+        ]
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(
+                user=self.follower
+            ).values_list('post_id', flat=True)),
+            {post.id for post in posts[1:]}
+        )
+
+    @mock.patch('posts.settings.TIMELINE_FANOUT_MAX_FOLLOWERS', 1)
+    def test_posts_of_formerly_popular_author_stay_in_feed(self):
+        """Посты, опубликованные, пока автор был выше порога раскладки,
+        остаются в ленте, когда подписчиков становится меньше."""
+        other = User.objects.create_user(username=OTHER_FOLLOWER)
+        AuthorStats.for_author(self.author)
+        Follow.objects.create(user=self.follower, author=self.author)
+        follow = Follow.objects.create(user=other, author=self.author)
+        hot_post = Post.objects.create(author=self.author, text=TEXT)
+        follow.delete()
+        new_post = Post.objects.create(author=self.author, text=TEXT)
+        self.assertFalse(TimelineEntry.objects.filter(post=hot_post))
+        self.assertEqual(
+            self.feed_ids(), {self.old_post.id, hot_post.id, new_post.id}
+        )
+
+    @mock.patch('posts.settings.TIMELINE_FANOUT_MAX_FOLLOWERS', 1)
+    def test_recount_keeps_fan_out_marker(self):
+        """recount_posts --authors пересчитывает статистику на месте и не
+        теряет отметку о возврате автора под порог раскладки."""
+        other = User.objects.create_user(username=OTHER_FOLLOWER)
+        AuthorStats.for_author(self.author)
+        Follow.objects.create(user=self.follower, author=self.author)
+        follow = Follow.objects.create(user=other, author=self.author)
+        hot_post = Post.objects.create(author=self.author, text=TEXT)
+        follow.delete()
+        AuthorStats.objects.filter(user=self.author).update(posts_count=0)
+        call_command('recount_posts', authors=True, stdout=StringIO())
+        stats = AuthorStats.objects.get(user=self.author)
+        self.assertEqual(stats.posts_count, 2)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertIn(hot_post.id, self.feed_ids())
@@ -8,7 +8,8 @@ from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from posts.models import Comment, Follow, Group, Like, Post, User
-from posts.settings import PAGINATOR_PAGE
+from posts.loaders import load_post_detail
+from posts.settings import COMMENTS_PAGE, PAGINATOR_PAGE
 
 COMMENT = 'Тестовый комментарий'
 SLUG = 'test-slug'
@@ -173,6 +174,12 @@ class PostPagesTests(TestCase):
             context['post'].comments.all()
         )
 
+    def test_authors_index_does_not_load_posts(self):
+        """Список авторов строится одним запросом на страницу."""
+        cache.clear()
+        with self.assertNumQueries(2):
+            self.guest.get(AUTHORS_INDEX_URL)
+
     def test_author_on_profile_page(self):
         """Автор на странице профиля."""
         self.assertEqual(
@@ -191,13 +198,112 @@ class PostPagesTests(TestCase):
     def test_index_page_cache(self):
         """Проверка кэширования списка постов главной страницы."""
         before = self.guest.get(INDEX_URL).content
-        Post.objects.all().delete()
+        # update() не вызывает сигналы - кэш не сбрасывается
+        Post.objects.update(text=TEXT_OTHER)
         after = self.guest.get(INDEX_URL).content
         self.assertEqual(after, before)
         cache.clear()
         cache_cleared = self.guest.get(INDEX_URL).content
         self.assertNotEqual(cache_cleared, after)
 
+    def test_feed_caches_invalidated_on_change(self):
+        """Новый пост сразу сбрасывает кэш главной, группы и профиля."""
+        urls = [INDEX_URL, GROUP_URL, PROFILE_URL]
+        before = {url: self.guest.get(url).content for url in urls}
+        Post.objects.create(
+            author=self.author, text=TEXT_OTHER, group=self.group
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                after = self.guest.get(url).content
+                self.assertNotEqual(after, before[url])
+                self.assertIn(TEXT_OTHER, after.decode())
+
+    def test_post_card_cache_invalidated_on_edit(self):
+        """Карточка поста берётся из кэша до правки поста."""
+        def follow_page():
+            return self.auth_follower.get(FOLLOW_LIST_URL).content.decode()
+
+        cache.clear()
+        follow_page()
+        Post.objects.filter(id=self.post.id).update(text=TEXT_OTHER)
+        self.assertNotIn(TEXT_OTHER, follow_page())
+        Post.objects.get(id=self.post.id).save()
+        self.assertIn(TEXT_OTHER, follow_page())
+
+    def test_post_card_shows_renamed_group(self):
+        """Переименование сообщества сразу видно в карточках на главной."""
+        self.guest.get(INDEX_URL)
+        group = Group.objects.get(id=self.group.id)
+        group.title = TITLE_OTHER
+        group.save()
+        self.assertIn(TITLE_OTHER, self.guest.get(INDEX_URL).content.decode())
+
+    def test_post_card_shows_renamed_author(self):
+        """Новое имя автора сразу видно в карточках лент."""
+        urls = [INDEX_URL, GROUP_URL, FOLLOW_LIST_URL]
+        for url in urls:
+            self.auth_follower.get(url)
+        author = User.objects.get(id=self.author.id)
+        author.first_name = 'Переименованный'
+        author.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertIn(
+                    'Переименованный',
+                    self.auth_follower.get(url).content.decode()
+                )
+
+    def test_conditional_get(self):
+        """Ленты и страница поста отвечают 304 на актуальный ETag или
+        Last-Modified и отдают новую страницу после изменений."""
+        urls = [INDEX_URL, GROUP_URL, PROFILE_URL, self.POST_DETAIL_URL]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest.get(url)
+                etag = response['ETag']
+                self.assertEqual(self.guest.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                ).status_code, 304)
+                self.assertEqual(self.guest.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                ).status_code, 304)
+                self.assertEqual(self.auth_follower.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                ).status_code, 200)
+        etags = {url: self.guest.get(url)['ETag'] for url in urls}
+        Comment.objects.create(
+            author=self.follower, post=self.post, text=COMMENT
+        )
+        Post.objects.get(id=self.post.id).save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.guest.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                ).status_code, 200)
+
+    def test_new_csrf_secret_resets_etag(self):
+        """После смены секрета CSRF страница с формой отдаётся заново."""
+        client = Client()
+        client.force_login(self.follower)
+        etag = client.get(self.POST_DETAIL_URL)['ETag']
+        client.cookies.pop(settings.CSRF_COOKIE_NAME)
+        response = client.get(self.POST_DETAIL_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_feed_does_not_set_csrf_cookie(self):
+        """Ленты без форм не выдают cookie CSRF, и их ETag у анонимов
+        общий."""
+        responses = [Client().get(INDEX_URL) for _ in range(2)]
+        self.assertNotIn(settings.CSRF_COOKIE_NAME, responses[0].cookies)
+        self.assertEqual(responses[0]['ETag'], responses[1]['ETag'])
+
+    def test_last_modified_stable_after_cache_clear(self):
+        cache.clear()
+        first = self.guest.get(INDEX_URL)['Last-Modified']
+        self.assertEqual(self.guest.get(INDEX_URL)['Last-Modified'], first)
+
     def test_follow_author(self):
         """Авторизованный пользователь может подписаться на автора."""
         self.assertFalse(
@@ -272,3 +378,86 @@ class PaginatorViewsTest(TestCase):
                     self.assertEqual(
                         len(response.context['page_obj']), expected
                     )
+
+    def test_cursor_pages_contain_required_posts_number(self):
+        """Курсорная пагинация отдаёт полные страницы в обе стороны."""
+        urls = [
+            INDEX_URL,
+            GROUP_URL,
+            PROFILE_URL,
+            FOLLOW_LIST_URL
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.auth_follower.get(url + '?cursor=')
+                page_obj = first.context['page_obj']
+                self.assertEqual(len(page_obj), PAGINATOR_PAGE)
+                self.assertFalse(page_obj.has_previous())
+                second = self.auth_follower.get(
+                    f'{url}?cursor={page_obj.next_cursor}'
+                ).context['page_obj']
+                self.assertEqual(len(second), 3)
+                self.assertFalse(second.has_next())
+                self.assertFalse(
+                    set(post.id for post in second)
+                    & set(post.id for post in page_obj)
+                )
+                back = self.auth_follower.get(
+                    f'{url}?cursor={second.previous_cursor}'
+                ).context['page_obj']
+                self.assertEqual(
+                    [post.id for post in back],
+                    [post.id for post in page_obj]
+                )
+
+
+class PostDetailLoaderTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR)
+        cls.follower = User.objects.create_user(username=FOLLOWER)
+        cls.post = Post.objects.create(author=cls.author, text=TEXT)
+        Comment.objects.bulk_create(
+            Comment(author=cls.follower, post=cls.post, text=COMMENT)
+            for _ in range(COMMENTS_PAGE + 5)
+        )
+        Like.objects.create(user=cls.follower, post=cls.post)
+
+    def test_detail_loaded_in_two_queries(self):
+        """Пост, автор, статистика и лайк - одним запросом, окно
+        комментариев с авторами - вторым."""
+        load_post_detail(self.post.id, self.follower)
+        with self.assertNumQueries(2):
+            detail = load_post_detail(self.post.id, self.follower)
+            self.assertEqual(detail.post.author.username, AUTHOR)
+            self.assertEqual(detail.author_stats.posts_count, 1)
+            for comment in detail.comments:
+                self.assertEqual(comment.author.username, FOLLOWER)
+        self.assertTrue(detail.has_like)
+        self.assertEqual(len(detail.comments), COMMENTS_PAGE)
+        self.assertTrue(detail.comments_cursor)
+
+    def test_comments_loaded_by_cursor(self):
+        """«Показать ещё» отдаёт следующее окно комментариев по курсору."""
+        url = reverse('posts:post_comments', args=[self.post.id])
+        detail = load_post_detail(self.post.id, self.follower)
+        response = self.client.get(url, {'cursor': detail.comments_cursor})
+        self.assertTemplateUsed(response, 'posts/includes/comment_list.html')
+        comments = response.context['comments']
+        self.assertEqual(len(comments), 5)
+        self.assertFalse(response.context['comments_cursor'])
+        self.assertEqual(
+            [comment.id for comment in detail.comments + comments],
+            list(self.post.comments.order_by('created', 'id').values_list(
+                'id', flat=True
+            ))
+        )
+        page = self.client.get(reverse('posts:post_detail', args=[
+            self.post.id
+        ])).content.decode()
+        self.assertIn(f'{url}?cursor={detail.comments_cursor}', page)
+
+    def test_author_has_no_like_state(self):
+        detail = load_post_detail(self.post.id, self.author)
+        self.assertFalse(detail.has_like)
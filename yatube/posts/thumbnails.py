@@ -0,0 +1,71 @@
+"""Миниатюры изображений постов.
+
+Миниатюра строится один раз при сохранении нового изображения, вне потока
+запроса, и хранится в поле Post.thumbnail: шаблоны не вызывают Pillow.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image
+
+from core import routers
+from posts import settings
+from posts.models import Post
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.THUMBNAIL_WORKERS, thread_name_prefix='thumbnail'
+)
+
+
+def schedule(post):
+    """Ставит построение миниатюры в очередь после фиксации транзакции."""
+    if not settings.THUMBNAIL_ASYNC:
+        make_thumbnail(post.id)
+        return
+    transaction.on_commit(
+        lambda: executor.submit(make_thumbnail_in_worker, post.id)
+    )
+
+
+def discard(post):
+    """Удаляет миниатюру прежнего изображения, чтобы карточка не
+    показывала её вместо нового изображения или после его удаления."""
+    if not post.thumbnail:
+        return
+    post.thumbnail.delete(save=False)
+    Post.objects.filter(id=post.id).update(thumbnail='')
+
+
+def make_thumbnail_in_worker(post_id):
+    close_old_connections()
+    routers.reset()
+    try:
+        make_thumbnail(post_id)
+    finally:
+        close_old_connections()
+
+
+def make_thumbnail(post_id):
+    post = Post.objects.filter(id=post_id).first()
+    if post is None or not post.image:
+        return
+    with post.image.open('rb') as source:
+        image = Image.open(source)
+        image.thumbnail(settings.THUMBNAIL_SIZE)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        content = BytesIO()
+        image.save(content, format='JPEG', quality=85)
+    width, height = settings.THUMBNAIL_SIZE
+    name = os.path.splitext(os.path.basename(post.image.name))[0]
+    if post.thumbnail:
+        post.thumbnail.delete(save=False)
+    post.thumbnail.save(
+        f'{name}_{width}x{height}.jpg',
+        ContentFile(content.getvalue()),
+        save=False
+    )
+    post.save(update_fields=('thumbnail', 'updated'))
@@ -0,0 +1,168 @@
+"""Лента подписок с раскладкой постов по лентам читателей при публикации.
+
+Посты авторов, у которых подписчиков больше TIMELINE_FANOUT_MAX_FOLLOWERS,
+не раскладываются: читатель получает их запросом к таблице постов. Так же
+читаются посты, опубликованные автором до возврата под порог. Ленты
+обрезаются до TIMELINE_LIMIT при раскладке и заполнении; команда
+trim_timelines обрезает все ленты разом (например, после смены лимита).
+"""
+from collections import defaultdict
+
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from posts import settings
+from posts.models import AuthorStats, Follow, Post, TimelineEntry
+
+
+def is_fanned_out(author):
+    return (AuthorStats.for_author(author).followers_count
+            <= settings.TIMELINE_FANOUT_MAX_FOLLOWERS)
+
+
+def fan_out(post):
+    """Добавляет новый пост в ленты подписчиков автора."""
+    fan_out_many(post.author, [post])
+
+
+def fan_out_many(author, posts):
+    """Добавляет новые посты автора в ленты его подписчиков."""
+    if not is_fanned_out(author):
+        return
+    followers = list(Follow.objects.filter(
+        author_id=author.id
+    ).values_list('user_id', flat=True))
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post=post, created=post.created)
+         for user_id in followers for post in posts),
+        batch_size=500,
+        ignore_conflicts=True
+    )
+    for user_id in overflowing(author.id):
+        trim(user_id)
+
+
+def overflowing(author_id):
+    """Подписчики автора, чьи ленты длиннее TIMELINE_LIMIT. Проверяется
+    наличие записи за лимитом: не больше TIMELINE_LIMIT шагов по индексу
+    на ленту, без подсчёта и сортировки."""
+    beyond_limit = TimelineEntry.objects.filter(
+        user_id=OuterRef('user_id')
+    ).order_by().values('id')[
+        settings.TIMELINE_LIMIT:settings.TIMELINE_LIMIT + 1
+    ]
+    return Follow.objects.filter(author_id=author_id).annotate(
+        overflow=Subquery(beyond_limit)
+    ).filter(overflow__isnull=False).values_list('user_id', flat=True)
+
+
+def backfill(follow):
+    """Заполняет ленту нового подписчика последними постами автора."""
+    if not is_fanned_out(follow.author):
+        return
+    posts = Post.objects.filter(author_id=follow.author_id).order_by(
+        '-created'
+    ).values_list('id', 'created')[:settings.TIMELINE_LIMIT]
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=follow.user_id, post_id=post_id,
+                       created=created)
+         for post_id, created in posts),
+        batch_size=500,
+        ignore_conflicts=True
+    )
+    trim(follow.user_id)
+
+
+def backfill_many(follows):
+    """backfill для пакета подписок: запрос постов и вставка на каждого
+    читателя. Авторы без записи статистики считаются раскладываемыми."""
+    hot_authors = set(AuthorStats.objects.filter(
+        user_id__in={follow.author_id for follow in follows},
+        followers_count__gt=settings.TIMELINE_FANOUT_MAX_FOLLOWERS
+    ).values_list('user_id', flat=True))
+    authors_by_user = defaultdict(set)
+    for follow in follows:
+        if follow.author_id not in hot_authors:
+            authors_by_user[follow.user_id].add(follow.author_id)
+    for user_id, author_ids in authors_by_user.items():
+        posts = Post.objects.filter(author_id__in=author_ids).order_by(
+            '-created'
+        ).values_list('id', 'created')[:settings.TIMELINE_LIMIT]
+        TimelineEntry.objects.bulk_create(
+            (TimelineEntry(user_id=user_id, post_id=post_id, created=created)
+             for post_id, created in posts),
+            batch_size=500,
+            ignore_conflicts=True
+        )
+        trim(user_id)
+
+
+def resume_fan_out(author_id):
+    """Отмечает, что автор после отписки вернулся под порог раскладки."""
+    AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count=settings.TIMELINE_FANOUT_MAX_FOLLOWERS
+    ).update(fanned_out_since=timezone.now())
+
+
+def prune(follow):
+    """Убирает из ленты отписавшегося посты автора."""
+    TimelineEntry.objects.filter(
+        user_id=follow.user_id, post__author_id=follow.author_id
+    ).delete()
+
+
+def trim(user_id):
+    """Оставляет в ленте не больше TIMELINE_LIMIT последних записей."""
+    entries = TimelineEntry.objects.filter(user_id=user_id)
+    cutoff = entries.order_by('-created').values_list('created', flat=True)[
+        settings.TIMELINE_LIMIT:settings.TIMELINE_LIMIT + 1
+    ]
+    if cutoff:
+        entries.filter(created__lte=cutoff[0]).delete()
+
+
+def trim_all():
+    """trim для всех лент длиннее TIMELINE_LIMIT; возвращает их число."""
+    sizes = TimelineEntry.objects.order_by().values('user_id').annotate(
+        total=Count('id')
+    )
+    user_ids = list(sizes.filter(
+        total__gt=settings.TIMELINE_LIMIT
+    ).values_list('user_id', flat=True))
+    for user_id in user_ids:
+        trim(user_id)
+    return len(user_ids)
+
+
+def feed_for(user):
+    """Посты ленты подписок: материализованная часть плюс посты
+    авторов, которые не раскладываются по лентам, и посты, которые
+    автор опубликовал до возврата под порог раскладки.
+
+    Без таких авторов лента читается по индексу timeline_user_created_idx
+    в порядке индекса, без сортировки; иначе сортируется объединение, не
+    больше TIMELINE_LIMIT записей и постов горячих авторов."""
+    posts = Post.objects.select_related('author', 'group')
+    authors = Follow.objects.filter(user=user).filter(
+        Q(author__stats__followers_count__gt=(
+            settings.TIMELINE_FANOUT_MAX_FOLLOWERS
+        )) | Q(author__stats__fanned_out_since__isnull=False)
+    ).values_list(
+        'author_id', 'author__stats__followers_count',
+        'author__stats__fanned_out_since'
+    )
+    authors = list(authors)
+    if not authors:
+        return posts.filter(timeline_entries__user=user).order_by(
+            '-timeline_entries__created', '-timeline_entries__id'
+        )
+    condition = Q(id__in=TimelineEntry.objects.filter(
+        user=user
+    ).values('post_id'))
+    for author_id, followers, since in authors:
+        if followers > settings.TIMELINE_FANOUT_MAX_FOLLOWERS:
+            condition |= Q(author_id=author_id)
+        else:
+            condition |= Q(author_id=author_id, created__lt=since)
+    return posts.filter(condition)
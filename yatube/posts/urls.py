@@ -17,6 +17,9 @@ urlpatterns = [
     path('posts/<int:post_id>/',
          views.post_detail,
          name='post_detail'),
+    path('posts/<int:post_id>/comments/',
+         views.post_comments,
+         name='post_comments'),
     path('create/',
          views.post_create,
          name='post_create'),
@@ -38,6 +41,9 @@ urlpatterns = [
     path('groups/',
          views.groups_index,
          name='groups_index'),
+    path('search/',
+         views.post_search,
+         name='search'),
     path('authors/',
          views.authors_index,
          name='authors_index'),
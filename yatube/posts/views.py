@@ -1,48 +1,90 @@
+from urllib.parse import urlencode
+
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db.models import Exists, OuterRef
 from django.shortcuts import get_object_or_404, redirect, render
 
-from posts import settings
+from core.conditional import conditional, csrf_secret, make_etag
+from posts import caching, search, settings, timeline
 from posts.forms import CommentForm, PostForm
-from posts.models import Follow, Group, Like, Post, User
+from posts.loaders import load_comments, load_post_detail
+from posts.models import AuthorStats, Follow, Group, Like, Post, User
+from posts.pagination import CursorPaginator
 
 
 def paginator(request, posts):
+    if settings.PAGINATOR_CURSOR or 'cursor' in request.GET:
+        return CursorPaginator(posts, settings.PAGINATOR_PAGE).get_page(
+            request.GET.get('cursor')
+        )
     paginator = Paginator(posts, settings.PAGINATOR_PAGE)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
 
 
+def render_feed(request, template, context, scope, *state):
+    """Лента с условным GET. Валидаторы - версия области и строки
+    страницы (id, updated, счётчики); разбор страницы кэширует её
+    записи, и шаблон повторно к БД не обращается."""
+    page = context['page_obj']
+    rows = [
+        (post.id, post.updated, post.comment_count, post.like_count)
+        for post in page
+    ]
+    etag = make_etag(
+        caching.version(scope), request.user.pk, request.get_full_path(),
+        rows, *state
+    )
+    last_modified = max(
+        [caching.changed_at(scope)] + [post.updated for post in page]
+    )
+    return conditional(
+        request, etag, last_modified,
+        lambda: render(request, template, context)
+    )
+
+
 def index(request):
-    return render(request, 'posts/index.html', {
+    return render_feed(request, 'posts/index.html', {
         'page_obj': paginator(
             request, Post.objects.select_related('author', 'group').all()
-        )
-    })
+        ),
+        **caching.fragment('index')
+    }, 'index')
 
 
 def groups_index(request):
-    return render(
-        request, 'posts/groups.html', {'groups': Group.objects.all()}
-    )
+    return render(request, 'posts/groups.html', {
+        'groups': Group.objects.all(),
+        **caching.fragment('groups')
+    })
 
 
 def authors_index(request):
-    users = User.objects.prefetch_related('posts').all()
-    authors = [user for user in users if user.posts.exists()]
-    return render(
-        request,
-        'posts/authors.html',
-        {'authors': authors}
+    authors = User.objects.annotate(
+        has_posts=Exists(Post.objects.filter(author=OuterRef('pk')))
+    ).filter(has_posts=True).only(
+        'username', 'first_name', 'last_name'
+    ).order_by('username')
+    authors = Paginator(authors, settings.PAGINATOR_PAGE).get_page(
+        request.GET.get('page')
     )
+    return render(request, 'posts/authors.html', {
+        'authors': authors,
+        'page_obj': authors,
+        'cache_timeout': settings.AUTHORS_CACHE_TIMEOUT
+    })
 
 
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    return render(request, 'posts/group_list.html', {
+    scope = f'group:{group.id}'
+    return render_feed(request, 'posts/group_list.html', {
         'group': group,
-        'page_obj': paginator(request, group.posts.all())
-    })
+        'page_obj': paginator(request, group.posts.select_related('author')),
+        **caching.fragment(scope)
+    }, scope, group.title, group.description)
 
 
 def profile(request, username):
@@ -51,23 +93,67 @@ def profile(request, username):
                  and request.user != author
                  and Follow.objects.
                  filter(author=author, user=request.user).exists())
-    return render(request, 'posts/profile.html', {
+    stats = AuthorStats.for_author(author)
+    scope = f'profile:{author.id}'
+    return render_feed(request, 'posts/profile.html', {
         'author': author,
+        'stats': stats,
         'following': following,
-        'page_obj': paginator(request, author.posts.all())
+        'page_obj': paginator(request, author.posts.select_related('group')),
+        **caching.fragment(scope)
+    }, scope, author.get_full_name(), following, stats.posts_count,
+        stats.followers_count, stats.following_count)
+
+
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    posts = search.search(
+        Post.objects.select_related('author', 'group'), query
+    )
+    page_obj = Paginator(posts, settings.PAGINATOR_PAGE).get_page(
+        request.GET.get('page')
+    )
+    return render(request, 'posts/search.html', {
+        'query': query,
+        'page_obj': page_obj,
+        'query_prefix': urlencode({'q': query}) + '&',
+        'card_cache_timeout': settings.CARD_CACHE_TIMEOUT
     })
 
 
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    has_like = (request.user.is_authenticated
-                and request.user != post.author
-                and Like.objects.
-                filter(post_id=post_id, user=request.user).exists())
-    return render(request, 'posts/post_detail.html', {
+    detail = load_post_detail(post_id, request.user)
+    post = detail.post
+    changed = [comment.updated for comment in detail.comments]
+    etag = make_etag(
+        post.updated, post.comment_count, post.like_count, detail.has_like,
+        request.user.pk, csrf_secret(request),
+        [comment.id for comment in detail.comments],
+        changed, detail.author_stats.posts_count
+    )
+    # удаление комментария или лайка не оставляет строк с датой,
+    # но меняет время области index
+    last_modified = max(
+        [post.updated, caching.changed_at('index')] + changed
+    )
+    return conditional(request, etag, last_modified, lambda: render(
+        request, 'posts/post_detail.html', {
+            **detail._asdict(),
+            'form': CommentForm()
+        }
+    ))
+
+
+def post_comments(request, post_id):
+    """Следующее окно комментариев - фрагмент для кнопки «Показать ещё»."""
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    comments, cursor = load_comments(
+        post, settings.COMMENTS_PAGE, request.GET.get('cursor')
+    )
+    return render(request, 'posts/includes/comment_list.html', {
         'post': post,
-        'has_like': has_like,
-        'form': CommentForm()
+        'comments': comments,
+        'comments_cursor': cursor
     })
 
 
@@ -116,10 +202,8 @@ def add_comment(request, post_id):
 @login_required
 def follow_index(request):
     context = {
-        'page_obj':
-        paginator(
-            request, Post.objects.filter(author__following__user=request.user)
-        )
+        'page_obj': paginator(request, timeline.feed_for(request.user)),
+        'card_cache_timeout': settings.CARD_CACHE_TIMEOUT
     }
     return render(request, 'posts/follow.html', context)
 
@@ -0,0 +1,18 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Django 2.2 has no native ASGI handler, so the WSGI application is served
+through core.asgi.PooledWsgiToAsgi with a bounded pool of worker threads.
+"""
+
+import os
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import PooledWsgiToAsgi
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = PooledWsgiToAsgi(get_wsgi_application(), settings.ASGI_THREADS)
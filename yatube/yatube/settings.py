@@ -36,11 +36,12 @@ INSTALLED_APPS = [
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
     'sorl.thumbnail',
-    'debug_toolbar',
     'drf_yasg'
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -48,10 +49,21 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
-    'debug_toolbar_force.middleware.ForceDebugToolbarMiddleware'
 ]
 
+if DEBUG:
+    INSTALLED_APPS += ['debug_toolbar']
+    MIDDLEWARE += [
+        'debug_toolbar.middleware.DebugToolbarMiddleware',
+        'debug_toolbar_force.middleware.ForceDebugToolbarMiddleware'
+    ]
+
+# Доля запросов, которые замеряет core.middleware.ProfilingMiddleware
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0.01))
+
+# Размер пула потоков для представлений в ASGI-режиме (yatube/asgi.py)
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', 16))
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
@@ -80,13 +92,44 @@ TEMPLATES = [
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
+# Профиль БД. production: соединения живут между запросами, SQLite
+# пишет в WAL, и запись комментариев и лайков не блокирует чтение.
+DB_PROFILE = os.getenv('DB_PROFILE', 'development')
+PRODUCTION_DB = DB_PROFILE == 'production'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', 600))
+        if PRODUCTION_DB else 0,
     }
 }
 
+# Реплики только для чтения (core.routers): пути к файлам SQLite через
+# запятую. Синхронизация реплик с основной БД - забота окружения.
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', '').split(','))
+):
+    DATABASE_REPLICAS.append(f'replica{number}')
+    DATABASES[f'replica{number}'] = dict(
+        DATABASES['default'], NAME=name, TEST={'MIRROR': 'default'}
+    )
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Сколько секунд после записи клиент читает из основной БД, а не с реплик
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+
+# PRAGMA, которые core.signals выполняет на каждом новом соединении SQLite
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,
+} if PRODUCTION_DB else {}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -149,12 +192,23 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 
+# Файловый кэш общий для всех процессов (воркеров gunicorn) одного сервера
+# и не требует внешних сервисов, в отличие от memcached/redis.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', default=os.path.join(BASE_DIR, 'cache')
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
 
+# manage.py test подменяет файловый кэш на кэш в памяти
+TEST_RUNNER = 'core.testing.TestRunner'
+
 
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
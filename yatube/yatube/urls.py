@@ -10,6 +10,8 @@ from rest_framework import permissions
 from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 
+from core.views import profiling_stats
+
 
 handler403 = 'core.views.permission_denied'
 handler404 = 'core.views.page_not_found'
@@ -21,6 +23,7 @@ urlpatterns = [
     path('api/', include('api.urls')),
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
+    path('profiling/', profiling_stats, name='profiling_stats'),
     path('redoc/',
          TemplateView.as_view(template_name='redoc.html'),
          name='redoc'),